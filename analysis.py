@@ -0,0 +1,151 @@
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Mapping, Tuple
+
+from error_parser import ErrorParser, COMPONENT_TYPES
+from explanation_generator import ExplanationGenerator
+
+_NO_COMPONENTS: Mapping[str, str] = MappingProxyType({})
+
+
+class KnowledgeEntry:
+    """Immutable knowledge for one error type, shared by every result of that type"""
+
+    __slots__ = ('error_type', 'severity', 'summary', 'common_causes', 'solutions',
+                 'prevention_tips', 'learn_more')
+
+    def __init__(self, error_type: str, severity: str, knowledge: Dict[str, Any]):
+        self.error_type = error_type
+        self.severity = severity
+        self.summary = knowledge['summary']
+        self.common_causes = tuple(knowledge['common_causes'])
+        self.solutions = tuple(knowledge['solutions'])
+        self.prevention_tips = tuple(knowledge['prevention_tips'])
+        self.learn_more = knowledge['learn_more']
+
+
+class Analysis:
+    """Classification of one message; customized text is built only when read
+
+    Fields match the dict from ExplanationGenerator.generate_explanation, but
+    lists are tuples shared with the knowledge base and no timestamp is taken.
+    """
+
+    __slots__ = ('message', 'confidence', 'components', 'entry', '_analyzer')
+
+    def __init__(self, message: str, confidence: float, components: Mapping[str, str],
+                 entry: KnowledgeEntry, analyzer: 'Analyzer'):
+        self.message = message
+        self.confidence = confidence
+        self.components = components
+        self.entry = entry
+        self._analyzer = analyzer
+
+    @property
+    def error_type(self) -> str:
+        return self.entry.error_type
+
+    @property
+    def severity(self) -> str:
+        return self.entry.severity
+
+    @property
+    def summary(self) -> str:
+        return self.entry.summary
+
+    @property
+    def prevention_tips(self) -> Tuple[str, ...]:
+        return self.entry.prevention_tips
+
+    @property
+    def learn_more(self):
+        return self.entry.learn_more
+
+    @property
+    def likely_cause(self) -> str:
+        return self._analyzer.generator.customize_cause(self.entry.common_causes, self.components)
+
+    @property
+    def solutions(self) -> Tuple[str, ...]:
+        if not self.components:
+            return self.entry.solutions
+        return tuple(self._analyzer.generator.customize_solutions(self.entry.solutions, self.components))
+
+    @property
+    def related_errors(self) -> list:
+        if self.entry.error_type != 'unknown' or not self.message:
+            return []
+        return self._analyzer.generator.related_errors(self.message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The same dict generate_explanation returns for this message"""
+        explanation = {
+            'error_type': self.error_type,
+            'severity': self.severity,
+            'summary': self.summary,
+            'likely_cause': self.likely_cause,
+            'solutions': list(self.solutions),
+            'prevention_tips': list(self.prevention_tips),
+            'learn_more': self.learn_more,
+            'confidence': self.confidence
+        }
+        if self.entry.error_type == 'unknown' and self.message:
+            explanation['related_errors'] = self.related_errors
+        return explanation
+
+    def __repr__(self) -> str:
+        return f"Analysis(error_type={self.error_type!r}, confidence={self.confidence!r})"
+
+
+class Analyzer:
+    """Library entry point that classifies messages into compact Analysis records"""
+
+    def __init__(self, parser: ErrorParser = None, generator: ExplanationGenerator = None):
+        self.parser = parser or ErrorParser()
+        self.generator = generator or ExplanationGenerator(parser=self.parser)
+        self.entries: Dict[str, KnowledgeEntry] = {}
+
+    def entry(self, error_type: str) -> KnowledgeEntry:
+        entry = self.entries.get(error_type)
+        if entry is None:
+            knowledge = self.generator.knowledge_base.get_knowledge(error_type)
+            entry = KnowledgeEntry(error_type, self.generator.assess_severity(error_type), knowledge)
+            self.entries[error_type] = entry
+        return entry
+
+    def analyze(self, message: str) -> Analysis:
+        """Classify one message"""
+        text = self.parser.window(message)
+        match = self.parser.engine.match(text)
+        error_type = match.error_type
+        if error_type in COMPONENT_TYPES:
+            components = self.parser.extract_components(text, error_type) or _NO_COMPONENTS
+        else:
+            components = _NO_COMPONENTS
+        return Analysis(message, self.parser.confidence_from_match(match, error_type),
+                        components, self.entry(error_type), self)
+
+    def analyze_many(self, messages: Iterable[str]) -> Iterator[Analysis]:
+        """Classify messages lazily, one record per message"""
+        analyze = self.analyze
+        for message in messages:
+            yield analyze(message)
+
+
+_default_analyzer = None
+
+
+def _analyzer() -> Analyzer:
+    global _default_analyzer
+    if _default_analyzer is None:
+        _default_analyzer = Analyzer()
+    return _default_analyzer
+
+
+def analyze(message: str) -> Analysis:
+    """Classify one message with the built-in knowledge"""
+    return _analyzer().analyze(message)
+
+
+def analyze_many(messages: Iterable[str]) -> Iterator[Analysis]:
+    """Classify many messages with the built-in knowledge"""
+    return _analyzer().analyze_many(messages)
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Throughput and latency benchmarks over a synthetic error corpus"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from cognito import Cognito
+
+COMMANDS = ['npm', 'docker', 'gti', 'pyhton', 'kubectl', 'sl', 'node', 'cargo', 'terraform', 'jq']
+PACKAGES = ['libssl-dev', 'python3-pip', 'nodejs', 'libc6', 'build-essential', 'docker-ce']
+HOSTS = ['archive.ubuntu.com', 'ppa.launchpad.net', 'github.com', 'registry.npmjs.org']
+PATHS = ['/etc/nginx/nginx.conf', '/var/lib/dpkg/lock-frontend', '/home/user/project/main.py',
+         '/tmp/build/output.log', './config.yaml', '/usr/local/bin/deploy.sh']
+CODENAMES = ['focal', 'jammy', 'noble', 'bionic']
+NOISE_WORDS = ['systemd', 'started', 'session', 'user', 'kernel', 'usb', 'device', 'eth0', 'link',
+               'up', 'cron', 'job', 'finished', 'audit', 'success', 'dhcp', 'lease', 'renewed']
+STARTUP_MESSAGE = "bash: npm: command not found"
+STARTUP_BUDGET_MS = 40.0
+ADVERSARIAL_LENGTH = 1 << 20
+ADVERSARIAL_BUDGET_MS = 50.0
+# Messages whose masked paths and URLs hold the only keyword a pattern needs
+CACHE_CHECK_LINES = [
+    'open /etc/file.conf failed', 'open /etc/nginx.conf failed',
+    'cp: /srv/permission/x: denied', 'cp: /srv/other/x: denied',
+    'wget https://example.com/timeout/x', 'wget https://example.com/ok/x',
+]
+
+
+def _apt(rng):
+    return rng.choice([
+        f"E: The repository 'http://{rng.choice(HOSTS)}/{rng.choice(PACKAGES)}/ubuntu "
+        f"{rng.choice(CODENAMES)} Release' does not have a Release file.",
+        f"W: Failed to fetch http://{rng.choice(HOSTS)}/ubuntu/dists/{rng.choice(CODENAMES)}/InRelease  404  Not Found",
+        f"E: Failed to fetch http://{rng.choice(HOSTS)}/pool/main/{rng.choice(PACKAGES)}.deb",
+    ])
+
+
+def _command(rng):
+    command = rng.choice(COMMANDS)
+    return rng.choice([
+        f"bash: {command}: command not found",
+        f"zsh: command not found: {command}",
+        f"Command '{command}' not found, but can be installed with:",
+    ])
+
+
+def _permission(rng):
+    return rng.choice([
+        f"cp: cannot create regular file '{rng.choice(PATHS)}': Permission denied",
+        "E: Could not open lock file /var/lib/dpkg/lock-frontend - open (13: Permission denied)",
+        "E: Unable to acquire the dpkg frontend lock, is another process using it?",
+        f"rm: cannot remove '{rng.choice(PATHS)}': Operation not permitted",
+    ])
+
+
+def _file(rng):
+    path = rng.choice(PATHS)
+    return rng.choice([
+        f"cat: {path}: No such file or directory",
+        f"ls: cannot access '{path}': No such file or directory",
+        f"python3: can't open file '{path}': [Errno 2] No such file or directory",
+    ])
+
+
+def _network(rng):
+    return rng.choice([
+        f"Temporary failure resolving '{rng.choice(HOSTS)}'",
+        f"curl: (7) Failed to connect to {rng.choice(HOSTS)} port 443: Connection timed out",
+        "ping: connect: Network is unreachable",
+    ])
+
+
+def _dependency(rng):
+    package = rng.choice(PACKAGES)
+    return rng.choice([
+        "The following packages have unmet dependencies:",
+        f" {package} : Depends: {rng.choice(PACKAGES)} but it is not going to be installed",
+        "E: Unable to correct problems, you have held broken packages.",
+    ])
+
+
+def _syntax(rng):
+    return rng.choice([
+        "bash: syntax error near unexpected token `('",
+        "  File \"main.py\", line 3\nSyntaxError: invalid syntax",
+        "E: Invalid operation instal",
+    ])
+
+
+def _noise(rng):
+    stamp = f"Oct {rng.randint(1, 28)} {rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}"
+    words = ' '.join(rng.choice(NOISE_WORDS) for _ in range(rng.randint(3, 12)))
+    return f"{stamp} host {rng.choice(NOISE_WORDS)}[{rng.randint(100, 99999)}]: {words}"
+
+
+def _long_line(rng, length):
+    chunk = ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789+/') for _ in range(64))
+    return (f"Uncaught TypeError at bundle.min.js:1:{rng.randint(1000, 99999)} "
+            + chunk * (length // len(chunk)) + " Connection timed out")
+
+
+GENERATORS = [
+    (_apt, 10), (_command, 15), (_permission, 12), (_file, 12), (_network, 12),
+    (_dependency, 6), (_syntax, 5), (_noise, 27),
+]
+
+
+def generate_corpus(size: int, seed: int = 0, long_line_ratio: float = 0.001,
+                    long_line_length: int = 20000) -> List[str]:
+    """Build a reproducible list of realistic error lines"""
+    rng = random.Random(seed)
+    builders = [builder for builder, _ in GENERATORS]
+    weights = [weight for _, weight in GENERATORS]
+    corpus = []
+    for _ in range(size):
+        if rng.random() < long_line_ratio:
+            corpus.append(_long_line(rng, long_line_length))
+        else:
+            corpus.append(rng.choices(builders, weights)[0](rng))
+    return corpus
+
+
+def adversarial_corpus(length: int = ADVERSARIAL_LENGTH) -> Dict[str, str]:
+    """Huge lines built to make backtracking regexes rescan the input"""
+    from error_parser import ErrorParser
+    from pattern_engine import gap_sequence
+
+    def repeat(text):
+        return text * max(1, length // len(text))
+
+    corpus = {
+        'base64_blob': 'E: ' + repeat('QUFBQUFB') + ' failed to fetch',
+        'minified_js': repeat('function(a,b){return a&&b.c(d)};') + ' Connection timed out',
+        'unbroken_word': "E: The repository 'x' " + repeat('A') + ' Release',
+        'many_quotes': 'No such file or directory ' + repeat("'"),
+        'access_repeats': repeat('cannot access ') + 'No such file or directory',
+        'open_repeats': repeat('open ') + 'Permission denied',
+    }
+    # Repeating the first literal of each gap pattern without its later literals
+    # forces a backtracking matcher to scan to the end once per repeat
+    parser = ErrorParser()
+    for table in (parser.patterns, parser.natural_patterns):
+        for patterns in table.values():
+            for pattern in patterns:
+                segments = gap_sequence(pattern)
+                if segments:
+                    corpus[f"repeat {pattern}"] = repeat(segments[0][0] + ' ')
+    return corpus
+
+
+def measure_adversarial(length: int = ADVERSARIAL_LENGTH) -> Dict[str, float]:
+    """Worst-case milliseconds for parse and explain of each adversarial line in hardened mode"""
+    cognito = Cognito()
+    cognito.harden()
+    timings = {}
+    for name, line in adversarial_corpus(length).items():
+        start = time.perf_counter()
+        cognito.generator.generate_explanation(cognito.parser.parse_error(line))
+        timings[name] = (time.perf_counter() - start) * 1e3
+    return timings
+
+
+def check_cache(corpus: List[str]) -> List[str]:
+    """Lines whose cached classification differs from an uncached parse"""
+    from error_parser import ErrorParser
+    from result_cache import CachedParser
+
+    parser = ErrorParser()
+    cached = CachedParser(ErrorParser())
+    mismatches = []
+    # Twice over, so the second pass is served from the cache
+    for line in (corpus + CACHE_CHECK_LINES) * 2:
+        expected = parser.parse_error(line)
+        result = cached.parse_error(line)
+        if any(result[field] != expected[field] for field in ('error_type', 'confidence', 'components')):
+            mismatches.append(line)
+    return mismatches
+
+
+def measure(func: Callable, inputs: List[Any]) -> Dict[str, float]:
+    """Call func on each input and report throughput and latency percentiles"""
+    latencies = []
+    clock = time.perf_counter_ns
+    start = clock()
+    for item in inputs:
+        before = clock()
+        func(item)
+        latencies.append(clock() - before)
+    total = (clock() - start) / 1e9
+
+    latencies.sort()
+    count = len(latencies)
+
+    def percentile(fraction):
+        return latencies[min(count - 1, int(count * fraction))] / 1e3 if count else 0.0
+
+    return {
+        'calls': count,
+        'total_seconds': total,
+        'lines_per_second': count / total if total else 0.0,
+        'p50_us': percentile(0.50),
+        'p99_us': percentile(0.99),
+        'max_us': latencies[-1] / 1e3 if count else 0.0
+    }
+
+
+def run_benchmarks(corpus: List[str]) -> Dict[str, Dict[str, float]]:
+    """Benchmark each pipeline stage and the full process_error path"""
+    cognito = Cognito()
+    parser = cognito.parser
+    generator = cognito.generator
+
+    typed = [(line, parser.classify_error(line)) for line in corpus]
+    parsed = [parser.parse_error(line) for line in corpus]
+
+    results = {
+        'classify_error': measure(parser.classify_error, corpus),
+        'extract_components': measure(lambda item: parser.extract_components(*item), typed),
+        'calculate_confidence': measure(lambda item: parser.calculate_confidence(*item), typed),
+        'generate_explanation': measure(generator.generate_explanation, parsed),
+    }
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        def process(line):
+            cognito.process_error(line)
+            sink.seek(0)
+            sink.truncate()
+        results['process_error'] = measure(process, corpus)
+    return results
+
+
+def measure_startup(runs: int = 20) -> Dict[str, float]:
+    """Median wall time of a one-shot `cognito "<message>"` run, and of a bare interpreter"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cognito.py')
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    def wall_ms(command):
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+            samples.append((time.perf_counter() - start) * 1e3)
+        return statistics.median(samples)
+
+    interpreter = wall_ms([sys.executable, '-c', 'pass'])
+    one_shot = wall_ms([sys.executable, script, STARTUP_MESSAGE])
+    return {
+        'runs': runs,
+        'interpreter_ms': interpreter,
+        'one_shot_ms': one_shot,
+        'overhead_ms': one_shot - interpreter
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print throughput and p99 changes against an earlier run"""
+    print(f"\n{'stage':<22}{'lines/s':>12}{'change':>10}{'p99 us':>12}{'change':>10}")
+    for stage, result in current['results'].items():
+        old = baseline.get('results', {}).get(stage)
+        if not old:
+            continue
+        speed = result['lines_per_second'] / old['lines_per_second'] - 1 if old['lines_per_second'] else 0.0
+        p99 = result['p99_us'] / old['p99_us'] - 1 if old['p99_us'] else 0.0
+        print(f"{stage:<22}{result['lines_per_second']:>12.0f}{speed:>+10.1%}{result['p99_us']:>12.1f}{p99:>+10.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cognito benchmarks')
+    parser.add_argument('--lines', type=int, default=20000, help='Synthetic corpus size')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus random seed')
+    parser.add_argument('--output', metavar='PATH', help='Write results as JSON')
+    parser.add_argument('--compare', metavar='PATH', help='Compare against an earlier JSON result')
+    parser.add_argument('--startup', action='store_true', help='Also measure one-shot CLI startup time')
+    parser.add_argument('--startup-budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                        help='Fail when startup exceeds the bare interpreter by more than this')
+    parser.add_argument('--adversarial', action='store_true',
+                        help='Also time pathological multi-megabyte lines in hardened mode')
+    parser.add_argument('--adversarial-budget-ms', type=float, default=ADVERSARIAL_BUDGET_MS,
+                        help='Fail when any adversarial line takes longer than this')
+    parser.add_argument('--check-cache', action='store_true',
+                        help='Fail when cached classifications differ from uncached ones')
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.lines, args.seed)
+    report = {
+        'python': platform.python_version(),
+        'lines': args.lines,
+        'seed': args.seed,
+        'timestamp': time.time(),
+        'results': run_benchmarks(corpus)
+    }
+
+    print(f"{'stage':<22}{'lines/s':>12}{'p50 us':>10}{'p99 us':>10}{'max us':>12}")
+    for stage, result in report['results'].items():
+        print(f"{stage:<22}{result['lines_per_second']:>12.0f}{result['p50_us']:>10.1f}"
+              f"{result['p99_us']:>10.1f}{result['max_us']:>12.1f}")
+
+    status = 0
+    if args.startup:
+        startup = report['startup'] = measure_startup()
+        print(f"\nstartup: {startup['one_shot_ms']:.1f} ms one-shot, {startup['interpreter_ms']:.1f} ms bare "
+              f"interpreter, {startup['overhead_ms']:.1f} ms overhead (budget {args.startup_budget_ms:.1f} ms)")
+        if startup['overhead_ms'] > args.startup_budget_ms:
+            print("startup budget exceeded")
+            status = 1
+
+    if args.adversarial:
+        adversarial = report['adversarial'] = measure_adversarial()
+        worst = max(adversarial, key=adversarial.get)
+        print(f"\nadversarial: {len(adversarial)} lines of ~{ADVERSARIAL_LENGTH >> 20} MB, worst "
+              f"{adversarial[worst]:.1f} ms ({worst}) (budget {args.adversarial_budget_ms:.1f} ms)")
+        if adversarial[worst] > args.adversarial_budget_ms:
+            print("adversarial latency budget exceeded")
+            status = 1
+
+    if args.check_cache:
+        mismatches = check_cache(corpus)
+        print(f"\ncache check: {len(mismatches)} of {2 * (len(corpus) + len(CACHE_CHECK_LINES))} lines differ")
+        for line in sorted(set(mismatches))[:10]:
+            print(f"   {line}")
+        if mismatches:
+            status = 1
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as handle:
+            compare(report, json.load(handle))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
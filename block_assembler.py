@@ -0,0 +1,110 @@
+import re
+import time
+from typing import Callable, Iterable, Iterator, List
+
+_EXCEPTION_LINE = re.compile(r"^[A-Za-z_][\w.]*(?:Error|Exception|Warning|Exit|Interrupt)\b")
+_APT_PREFIXES = ('E: ', 'W: ', 'N: ', 'Err:')
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_MAX_LINES = 200
+DEFAULT_MAX_CHARS = 64 * 1024
+
+
+def _block_kind(line: str) -> str:
+    """Decide what kind of block a line opens"""
+    if line.startswith('Traceback (most recent call last)'):
+        return 'python'
+    stripped = line.lstrip()
+    if stripped is not line and stripped.startswith('File "'):
+        return 'python'
+    if line.startswith('The following packages have unmet dependencies'):
+        return 'apt_dependencies'
+    if line.startswith(_APT_PREFIXES):
+        return 'apt'
+    return 'line'
+
+
+class BlockAssembler:
+    """Incrementally groups related log lines into multi-line error events
+
+    Python tracebacks run until their exception line, apt's unmet-dependency
+    report runs until its "E:" summary, other apt/dpkg output runs while lines
+    keep apt prefixes or indentation, and any other line absorbs
+    indented continuation lines. Blocks are bounded by max_lines and
+    max_chars and are flushed once no line has arrived for timeout seconds.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, max_lines: int = DEFAULT_MAX_LINES,
+                 max_chars: int = DEFAULT_MAX_CHARS, clock: Callable[[], float] = time.monotonic):
+        self.timeout = timeout
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+        self.clock = clock
+        self.lines: List[str] = []
+        self.kind = None
+        self.chars = 0
+        self.last_seen = 0.0
+
+    def _continues(self, line: str) -> bool:
+        if line[:1] in (' ', '\t'):
+            # An indented traceback frame outside a traceback starts a SyntaxError report
+            return self.kind == 'python' or _block_kind(line) != 'python'
+        if self.kind == 'python':
+            return _EXCEPTION_LINE.match(line) is not None
+        if self.kind in ('apt', 'apt_dependencies'):
+            return line.startswith(_APT_PREFIXES)
+        return False
+
+    def _ends_with(self, line: str) -> bool:
+        """Whether a line just added closes the open block"""
+        if self.kind == 'python':
+            return _EXCEPTION_LINE.match(line) is not None
+        if self.kind == 'apt_dependencies':
+            # apt closes its dependency report with a single "E:" summary line
+            return line.startswith('E: ')
+        return False
+
+    def _emit(self) -> str:
+        block = '\n'.join(self.lines)
+        self.lines = []
+        self.kind = None
+        self.chars = 0
+        return block
+
+    def feed(self, line: str) -> List[str]:
+        """Add a line, returning any blocks it completes"""
+        now = self.clock()
+        done = []
+        if self.lines and (now - self.last_seen >= self.timeout or not self._continues(line)):
+            done.append(self._emit())
+        self.last_seen = now
+
+        if not self.lines:
+            self.kind = _block_kind(line)
+        self.lines.append(line)
+        self.chars += len(line)
+
+        if self._ends_with(line):
+            done.append(self._emit())
+        elif len(self.lines) >= self.max_lines or self.chars >= self.max_chars:
+            done.append(self._emit())
+        return done
+
+    def flush_expired(self, now: float = None) -> List[str]:
+        """Return the open block if it has been idle for timeout seconds"""
+        now = self.clock() if now is None else now
+        if self.lines and now - self.last_seen >= self.timeout:
+            return [self._emit()]
+        return []
+
+    def flush(self) -> List[str]:
+        """Return the open block, if any, regardless of age"""
+        return [self._emit()] if self.lines else []
+
+
+def assemble_blocks(lines: Iterable[str], **options) -> Iterator[str]:
+    """Group a stream of raw lines into error blocks"""
+    assembler = BlockAssembler(**options)
+    for line in lines:
+        yield from assembler.feed(line)
+    yield from assembler.flush()
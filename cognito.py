@@ -1,23 +1,144 @@
 #!/usr/bin/env python3
-import argparse
 import sys
-import os
-from datetime import datetime
 
 from error_parser import ErrorParser
 from explanation_generator import ExplanationGenerator
-from knowledge_base import KnowledgeBase
-from banner import get_ascii_logo
+from knowledge_base import get_shared_knowledge_base
+from render import format_explanation
 
 class Cognito:
     def __init__(self):
+        self.knowledge = get_shared_knowledge_base()
         self.parser = ErrorParser()
-        self.generator = ExplanationGenerator()
-        self.knowledge = KnowledgeBase()
+        self.generator = ExplanationGenerator(self.knowledge, self.parser)
         self.version = "2.0"
         self.interaction_count = 0
+        self.stats = None
+        self.packs = None
+        self.output = None
+        self.failed = False
         
+    def load_packs(self, paths):
+        """Extend the built-in patterns and knowledge with knowledge-pack files"""
+        from knowledge_pack import PackRegistry
+        
+        self.packs = PackRegistry(paths)
+        self.packs.load()
+        self.packs.apply(self)
+    
+    def pack_paths(self):
+        """Paths of the loaded knowledge packs, for worker processes to load too"""
+        return tuple(self.packs.paths) if self.packs is not None else ()
+    
+    def reload_packs(self):
+        """Re-apply knowledge packs whose files changed since they were loaded"""
+        return self.packs is not None and self.packs.reload_if_changed(self)
+    
+    def harden(self, max_line_length=None):
+        """Bound the cost of matching huge or adversarial lines"""
+        from error_parser import DEFAULT_MAX_LINE_LENGTH
+        
+        parser = self.parser
+        while hasattr(parser, 'parser'):
+            parser = parser.parser
+        parser.harden(max_line_length or DEFAULT_MAX_LINE_LENGTH)
+    
+    def enable_model(self, path):
+        """Fall back to a trained classifier when the patterns are unsure"""
+        from text_model import ModelParser, NaiveBayesModel
+        
+        self.parser = ModelParser(self.parser, NaiveBayesModel.load(path))
+    
+    def enable_similarity(self, path):
+        """Reuse classifications of earlier, similar messages stored in an on-disk index"""
+        from similarity_index import SimilarityIndex, SimilarParser
+        
+        self.parser = SimilarParser(self.parser, SimilarityIndex(path))
+    
+    def close_similarity(self):
+        from similarity_index import SimilarParser
+        
+        similar = self.front_end(SimilarParser)
+        if similar is not None:
+            similar.index.close()
+    
+    def enable_history(self, path=None):
+        """Record every analysis in a local history store"""
+        from history_store import HistoryStore, HistoryParser, DEFAULT_HISTORY_PATH
+        
+        self.parser = HistoryParser(self.parser, HistoryStore(path or DEFAULT_HISTORY_PATH),
+                                    self.generator.assess_severity)
+    
+    def flush_history(self):
+        """Write recorded analyses still waiting for a full batch"""
+        from history_store import HistoryParser
+        
+        history = self.front_end(HistoryParser)
+        if history is not None:
+            history.store.flush()
+    
+    def close_history(self):
+        from history_store import HistoryParser
+        
+        history = self.front_end(HistoryParser)
+        if history is not None:
+            history.store.close()
+    
+    def front_end(self, kind):
+        """The parser front end of the given class, if one is installed"""
+        parser = self.parser
+        while hasattr(parser, 'parser'):
+            if isinstance(parser, kind):
+                return parser
+            parser = parser.parser
+        return None
+    
+    def enable_cache(self, path=None, max_size=None):
+        """Reuse classifications of repeated messages, optionally warmed from a file"""
+        from result_cache import CachedParser, DEFAULT_MAX_SIZE
+        
+        self.parser = CachedParser(self.parser, max_size=max_size or DEFAULT_MAX_SIZE)
+        if path:
+            self.parser.load(path)
+    
+    def save_cache(self, path):
+        try:
+            self.parser.save(path)
+        except OSError as e:
+            self.report_error(f"could not save cache: {e}")
+    
+    def report_error(self, error):
+        """Print an error, on stderr when results are JSON so it cannot corrupt them"""
+        self.failed = True
+        json_output = self.output is not None and self.output.format != 'text'
+        print(f"Error: {error}", file=sys.stderr if json_output else sys.stdout)
+    
+    def set_output(self, output_format='text', path=None):
+        """Send results through a buffered writer in the given format"""
+        from render import open_output
+        
+        self.output = open_output(output_format, path)
+    
+    def flush_output(self):
+        if self.output is not None:
+            self.output.flush()
+        else:
+            sys.stdout.flush()
+    
+    def close_output(self):
+        if self.output is not None:
+            self.output.close()
+    
+    def enable_stats(self):
+        """Record per-stage timings and per-pattern hit counts"""
+        from pipeline_stats import PipelineStats
+        
+        self.stats = PipelineStats().instrument(self)
+        return self.stats
+    
     def display_banner(self):
+        from banner import get_ascii_logo
+        
         print(get_ascii_logo())
         print("-" * 50)
         
@@ -47,36 +168,243 @@ class Cognito:
     
     def process_error(self, error_message):
         try:
-            print("Analyzing error...")
+            if self.output is None or self.output.format == 'text':
+                print("Analyzing error...")
             
             parsed_error = self.parser.parse_error(error_message)
             explanation = self.generator.generate_explanation(parsed_error)
             
             self.display_explanation(explanation)
+            self.flush_output()
             
         except Exception as e:
-            print(f"Error: {e}")
+            self.report_error(e)
+    
+    def process_stream(self, source, multiline=False):
+        """Analyze every line of a log file, or stdin when source is '-'"""
+        from log_stream import read_lines, analyze_lines, EXPLAIN_BATCH_SIZE
+        
+        # Lines from stdin may trickle in, so each is explained as soon as it arrives
+        batch_size = 1 if source == '-' else EXPLAIN_BATCH_SIZE
+        try:
+            if multiline:
+                from block_assembler import assemble_blocks
+                
+                lines = assemble_blocks(read_lines(source, keep_indent=True))
+            else:
+                lines = read_lines(source)
+            for explanation in analyze_lines(self.parser, self.generator, lines, batch_size):
+                self.display_explanation(explanation)
+                self.interaction_count += 1
+                
+        except Exception as e:
+            self.report_error(e)
+    
+    def process_follow(self, path, checkpoint=None, multiline=False, interval=None):
+        """Analyze lines as they are appended to a log file until interrupted"""
+        import time
+        from log_follow import LogFollower, DEFAULT_POLL_INTERVAL
+        from log_stream import analyze_lines
+        
+        interval = DEFAULT_POLL_INTERVAL if interval is None else interval
+        follower = LogFollower(path, checkpoint)
+        assembler = None
+        if multiline:
+            from block_assembler import BlockAssembler
+            
+            assembler = BlockAssembler()
+        
+        def explain(texts):
+            for explanation in analyze_lines(self.parser, self.generator, texts):
+                self.display_explanation(explanation)
+                self.interaction_count += 1
+        
+        # Where the first line not yet analyzed starts; an open block is reread after a restart
+        done = None
+        block_start = None
+        try:
+            follower.open()
+            done = follower.position
+            while True:
+                lines = follower.poll()
+                for line in lines:
+                    text = line.text.rstrip() if multiline else line.text.strip()
+                    if text and assembler is None:
+                        explain([text])
+                    elif text:
+                        explain(assembler.feed(text))
+                        if len(assembler.lines) == 1:
+                            block_start = line.start
+                    done = block_start if assembler is not None and assembler.lines else line.end
+                if assembler is not None:
+                    explain(assembler.flush_expired())
+                    if not assembler.lines:
+                        done = follower.position
+                self.flush_output()
+                follower.save_checkpoint(position=done)
+                if not lines:
+                    time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            follower.save_checkpoint(force=True, position=done)
+            follower.close()
+    
+    def process_pipeline(self, source, policy='block', workers=1, processes=False, queue_size=None,
+                         sample_rate=None, multiline=False):
+        """Analyze a log through bounded parse and explain stages that drop or sample lines under load"""
+        from log_stream import read_lines
+        from pipeline import Pipeline, format_counters, DEFAULT_QUEUE_SIZE, DEFAULT_SAMPLE_RATE
+        
+        pipeline = None
+        try:
+            pipeline = Pipeline.for_cognito(self, processes, workers=workers, policy=policy,
+                                            queue_size=queue_size or DEFAULT_QUEUE_SIZE,
+                                            sample_rate=sample_rate or DEFAULT_SAMPLE_RATE)
+            if multiline:
+                from block_assembler import assemble_blocks
+                
+                lines = assemble_blocks(read_lines(source, keep_indent=True))
+            else:
+                lines = read_lines(source)
+            for explanation in pipeline.run(lines):
+                self.display_explanation(explanation)
+                self.interaction_count += 1
+        except Exception as e:
+            self.report_error(e)
+        finally:
+            if pipeline is not None:
+                print(format_counters(pipeline.counters()), file=sys.stderr)
+    
+    def process_templates(self, source):
+        """Group a log into templates and explain each template once"""
+        from log_stream import read_lines
+        from template_miner import TemplateMiner
+        
+        try:
+            miner = TemplateMiner(self.parser).add_lines(read_lines(source))
+            self.display_templates(miner.lines, miner.summarize(self.generator))
+        except Exception as e:
+            self.report_error(e)
+    
+    def process_parallel(self, path, jobs, aggregate=False):
+        """Analyze a log file on several cores"""
+        from parallel import analyze_file_parallel, aggregate_file_parallel
+        
+        max_line_length, packs = self.parser.max_line_length, self.pack_paths()
+        try:
+            if aggregate:
+                self.display_aggregate(aggregate_file_parallel(path, jobs, max_line_length, packs))
+                return
+            
+            for explanation in analyze_file_parallel(path, jobs, max_line_length, packs):
+                self.display_explanation(explanation)
+                self.interaction_count += 1
+                
+        except Exception as e:
+            self.report_error(e)
+    
+    def process_report(self, source, jobs=1, top_k=None, window=None):
+        """Summarize a log with bounded memory: counts, top components and time windows"""
+        from report import StreamReport, DEFAULT_TOP_K, DEFAULT_WINDOW
+        
+        options = {'top_k': top_k or DEFAULT_TOP_K, 'window': window or DEFAULT_WINDOW}
+        try:
+            if source != '-' and jobs > 1:
+                from parallel import report_file_parallel
+                
+                report = report_file_parallel(source, jobs, self.parser.max_line_length, self.pack_paths(),
+                                              **options)
+            else:
+                from log_stream import read_lines
+                
+                report = StreamReport(self.parser, self.generator, **options).add_lines(read_lines(source))
+            self.display_report(report.result())
+        except Exception as e:
+            self.report_error(e)
+    
+    def process_incidents(self, source, window=None, key_by='host'):
+        """Join related errors from the same source into incidents, most likely root cause first"""
+        from correlator import IncidentCorrelator, DEFAULT_INCIDENT_WINDOW
+        from log_stream import read_lines
+        
+        try:
+            correlator = IncidentCorrelator(self.parser, self.generator, window or DEFAULT_INCIDENT_WINDOW, key_by)
+            for incident in correlator.correlate(read_lines(source)):
+                self.display_incident(incident)
+                self.interaction_count += 1
+        except Exception as e:
+            self.report_error(e)
+    
+    def display_incident(self, incident):
+        if self.output is not None and self.output.format != 'text':
+            self.output.write(incident)
+        else:
+            from correlator import format_incident
+            
+            self.display_text(format_incident(incident))
+    
+    def display_report(self, report):
+        if self.output is not None and self.output.format != 'text':
+            self.output.write(report)
+        else:
+            from report import format_report
+            
+            self.display_text(format_report(report))
+    
+    def display_aggregate(self, totals):
+        if self.output is not None and self.output.format != 'text':
+            self.output.write({
+                'lines': totals['lines'],
+                'error_types': dict(totals['error_types'].most_common()),
+                'severities': dict(totals['severities'].most_common())
+            })
+            return
+        
+        lines = ["\n" + "="*50, "COGNITO SUMMARY", "="*50, f"Lines analyzed: {totals['lines']}"]
+        
+        lines.append("\nError types:")
+        for error_type, count in totals['error_types'].most_common():
+            lines.append(f"   {error_type.replace('_', ' ').title()}: {count}")
+        
+        lines.append("\nSeverity:")
+        for severity, count in totals['severities'].most_common():
+            lines.append(f"   {severity.upper()}: {count}")
+        lines.append("="*50)
+        self.display_text("\n".join(lines))
+    
+    def display_templates(self, lines, summary):
+        if self.output is not None and self.output.format != 'text':
+            for entry in summary:
+                self.output.write(entry)
+            return
+        
+        text = ["\n" + "="*50, "COGNITO TEMPLATES", "="*50, f"Lines analyzed: {lines}", f"Templates: {len(summary)}"]
+        
+        for entry in summary:
+            explanation = entry['explanation']
+            text.append(f"\n[{entry['count']}x] {entry['template']}")
+            text.append(f"   Type: {explanation['error_type'].replace('_', ' ').title()} ({explanation['severity'].upper()})")
+            text.append(f"   Summary: {explanation['summary']}")
+            for name, values in entry['samples'].items():
+                shown = ', '.join(f"{value} ({count})" for value, count in values.items())
+                text.append(f"   {name.title()}: {shown}")
+        text.append("="*50)
+        self.display_text("\n".join(text))
+    
+    def display_text(self, text):
+        if self.output is None:
+            print(text)
+        else:
+            self.output.write_text(text)
     
     def display_explanation(self, explanation):
-        print("\n" + "="*50)
-        print("COGNITO ANALYSIS")
-        print("="*50)
-        print(f"Type: {explanation['error_type'].replace('_', ' ').title()}")
-        print(f"Severity: {explanation['severity'].upper()}")
-        print(f"Summary: {explanation['summary']}")
-        print(f"Cause: {explanation['likely_cause']}")
-        
-        print("\nSolutions:")
-        for i, solution in enumerate(explanation['solutions'], 1):
-            print(f"   {i}. {solution}")
-        
-        if explanation['prevention_tips']:
-            print("\nPrevention:")
-            for tip in explanation['prevention_tips']:
-                print(f"   - {tip}")
-        
-        print(f"\nConfidence: {explanation['confidence']:.0%}")
-        print("="*50)
+        if self.output is None:
+            print(format_explanation(explanation))
+        else:
+            self.output.write(explanation)
     
     def show_help(self):
         help_text = """
@@ -92,21 +420,223 @@ Examples:
         """
         print(help_text)
 
-def main():
-    cognito = Cognito()
+def build_arg_parser():
+    import argparse
     
     parser = argparse.ArgumentParser(description='Cognito - CLI Error Assistant')
-    parser.add_argument('error', nargs='?', help='Error message to analyze')
+    parser.add_argument('error', nargs='?', help="Error message to analyze ('-' reads lines from stdin)")
     parser.add_argument('-i', '--interactive', action='store_true', help='Interactive mode')
+    parser.add_argument('-f', '--file', metavar='PATH', help="Analyze every line of a log file ('-' for stdin)")
+    parser.add_argument('--follow', metavar='PATH', help='Analyze lines as they are appended to a log file')
+    parser.add_argument('--checkpoint', metavar='PATH', help='With --follow, save and resume the read offset at PATH')
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N', help='Worker processes for --file')
+    parser.add_argument('--aggregate', action='store_true', help='With --file, print type and severity counts only')
+    parser.add_argument('--multiline', action='store_true', help='Group tracebacks and apt/dpkg output into one event')
+    parser.add_argument('--report', action='store_true',
+                        help='With --file or stdin, print counts, top commands/files and time windows')
+    parser.add_argument('--top', type=int, metavar='K', help='Entries per top list in --report (default: 10)')
+    parser.add_argument('--window', type=int, metavar='SECONDS',
+                        help='Time window for --report (default: 3600) or --incidents (default: 300)')
+    parser.add_argument('--incidents', action='store_true',
+                        help='With --file or stdin, group related errors from one source into incidents')
+    parser.add_argument('--correlate-by', choices=('host', 'process', 'session', 'none'), default='host',
+                        help='Source that --incidents groups errors by (default: host)')
+    parser.add_argument('--templates', action='store_true', help='With --file, group lines into templates and explain each once')
+    parser.add_argument('--pipeline', choices=('block', 'drop_oldest', 'sample'),
+                        help='With --file or stdin, analyze through bounded queues, handling overload with this policy')
+    parser.add_argument('--processes', action='store_true', help='With --pipeline, run -j worker processes instead of threads')
+    parser.add_argument('--queue-size', type=int, metavar='N', help='With --pipeline, lines held per stage (default: 1024)')
+    parser.add_argument('--sample-rate', type=int, metavar='N',
+                        help='With --pipeline sample, keep 1 in N lines of each error type under load (default: 10)')
+    parser.add_argument('--serve', action='store_true', help='Run as a daemon on a Unix socket')
+    parser.add_argument('--client', action='store_true', help='Ask a running daemon to analyze the error')
+    parser.add_argument('--socket', metavar='PATH', help='Daemon socket path')
+    parser.add_argument('--pack', action='append', metavar='PATH', help='Load a knowledge pack (repeatable)')
+    parser.add_argument('--format', choices=('text', 'json', 'ndjson'), default='text',
+                        help='Output format for results (default: text)')
+    parser.add_argument('-o', '--output', metavar='PATH', help='Write results to PATH instead of stdout')
+    parser.add_argument('--safe', action='store_true',
+                        help='Cap line length and use backtracking-free matching for untrusted input')
+    parser.add_argument('--max-line-length', type=int, metavar='N',
+                        help='With --safe, match only the head and tail of lines longer than N (default: 8192)')
+    parser.add_argument('--similar', metavar='PATH',
+                        help='Learn confident classifications in an index at PATH and reuse them for similar unknown messages')
+    parser.add_argument('--train-model', metavar='CORPUS',
+                        help='Train the fallback classifier on "label<TAB>message" or JSON lines and save it to --model')
+    parser.add_argument('--model', metavar='PATH',
+                        help='Classifier to use when pattern confidence is low (trained with --train-model)')
+    parser.add_argument('--build-package-index', action='store_true',
+                        help='Index which packages provide each command, from apt Contents files and dpkg lists')
+    parser.add_argument('--package-root', metavar='DIR', default='/',
+                        help='With --build-package-index, read apt and dpkg data under DIR instead of /')
+    parser.add_argument('--package-index', metavar='PATH', help='Command-to-package index to build or use')
+    parser.add_argument('--record', action='store_true',
+                        help="Save every analysis to the history store (query it with 'cognito history')")
+    parser.add_argument('--history-db', metavar='PATH', help='History store for --record (default: ~/.cache/cognito/history.db)')
+    parser.add_argument('--stats', action='store_true', help='Print stage timings and pattern hit counts at exit')
+    parser.add_argument('--cache', metavar='PATH', help='Load and save the classification cache at PATH')
+    parser.add_argument('--cache-size', type=int, metavar='N', help='Maximum cached classifications')
+    return parser
+
+def check_combinations(arg_parser, args):
+    """Refuse options that a mode would otherwise silently ignore"""
+    routed = args.serve or args.interactive or args.follow
+    parallel = (args.file and args.file != '-' and (args.jobs > 1 or args.aggregate)
+                and not (routed or args.pipeline or args.incidents or args.report or args.templates))
+    parallel_report = (args.report and args.jobs > 1 and args.file and args.file != '-'
+                       and not (routed or args.pipeline or args.incidents))
+    processes = args.pipeline and args.processes and not routed
+    summary = (args.incidents or args.report or (args.file and args.templates)) and not (routed or args.pipeline)
+    if parallel and args.multiline:
+        arg_parser.error("--multiline cannot be combined with --jobs or --aggregate")
+    if summary and args.multiline:
+        arg_parser.error("--multiline cannot be combined with --report, --incidents or --templates")
+    if parallel or parallel_report or processes:
+        # Worker processes only rebuild the parser from knowledge packs; an
+        # unused --cache would even be saved back empty, and --stats would
+        # only see the parent, which classifies nothing
+        ignored = [flag for flag, value in (('--model', args.model), ('--similar', args.similar),
+                                            ('--record', args.record or args.history_db),
+                                            ('--cache', args.cache or args.cache_size),
+                                            ('--stats', args.stats)) if value]
+        if ignored:
+            arg_parser.error(f"{', '.join(ignored)} cannot be used with worker processes "
+                             "(--jobs, --aggregate or --processes)")
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    
+    if argv and argv[0] == 'history':
+        from history_store import main as history_main
+        
+        sys.exit(history_main(argv[1:]))
+    
+    # Shell hooks run `cognito "<message>"` after every failed command, so that
+    # case skips argparse and everything else only the other modes need.
+    if len(argv) == 1 and not argv[0].startswith('-'):
+        Cognito().process_error(argv[0])
+        return
+    
+    arg_parser = build_arg_parser()
+    args = arg_parser.parse_args(argv)
+    check_combinations(arg_parser, args)
+    if args.client:
+        from cognito_client import main as client_main
+        
+        sys.exit(client_main([args.error] if args.error else [], args.socket))
+    
+    if args.build_package_index:
+        from package_index import build_index, find_sources, DEFAULT_INDEX_PATH
+        
+        path = args.package_index or DEFAULT_INDEX_PATH
+        try:
+            count = build_index(find_sources(args.package_root), path)
+        except OSError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Indexed {count} commands in {path}")
+        return
+    
+    if args.train_model:
+        from text_model import train_file, DEFAULT_MODEL_PATH
+        
+        path = args.model or DEFAULT_MODEL_PATH
+        try:
+            result = train_file(args.train_model, path)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        print(f"Trained on {result['examples']} examples of {result['labels']} types, saved to {path}")
+        if result['holdout_accuracy'] is not None:
+            print(f"Held-out accuracy: {result['holdout_accuracy']:.1%}")
+        return
+    
+    cognito = Cognito()
+    # Setup errors must not land in a JSON result stream either
+    error_stream = sys.stdout if args.format == 'text' else sys.stderr
+    
+    if args.pack:
+        try:
+            cognito.load_packs(args.pack)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=error_stream)
+            sys.exit(1)
+    if args.package_index:
+        cognito.generator.package_index_path = args.package_index
+    if args.safe or args.max_line_length:
+        try:
+            cognito.harden(args.max_line_length)
+        except ValueError as e:
+            print(f"Error: {e}", file=error_stream)
+            sys.exit(1)
+    if args.cache or args.cache_size:
+        cognito.enable_cache(args.cache, args.cache_size)
+    if args.model:
+        try:
+            cognito.enable_model(args.model)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=error_stream)
+            sys.exit(1)
+    if args.similar:
+        try:
+            cognito.enable_similarity(args.similar)
+        except Exception as e:
+            print(f"Error: {e}", file=error_stream)
+            sys.exit(1)
+    if args.record or args.history_db:
+        try:
+            cognito.enable_history(args.history_db)
+        except Exception as e:
+            print(f"Error: {e}", file=error_stream)
+            sys.exit(1)
+    if args.stats:
+        cognito.enable_stats()
+    if not args.serve:
+        try:
+            cognito.set_output(args.format, args.output)
+        except OSError as e:
+            print(f"Error: {e}", file=error_stream)
+            sys.exit(1)
     
-    args = parser.parse_args()
+    try:
+        if args.serve:
+            from daemon import serve
+            
+            serve(cognito, args.socket)
+        elif args.interactive:
+            cognito.run_interactive()
+        elif args.follow:
+            cognito.process_follow(args.follow, args.checkpoint, multiline=args.multiline)
+        elif args.pipeline:
+            cognito.process_pipeline(args.file or '-', args.pipeline, max(args.jobs, 1), args.processes,
+                                     args.queue_size, args.sample_rate, multiline=args.multiline)
+        elif args.incidents:
+            cognito.process_incidents(args.file or '-', args.window, args.correlate_by)
+        elif args.report:
+            cognito.process_report(args.file or '-', max(args.jobs, 1), args.top, args.window)
+        elif args.file and args.templates:
+            cognito.process_templates(args.file)
+        elif args.file and args.file != '-' and (args.jobs > 1 or args.aggregate):
+            cognito.process_parallel(args.file, max(args.jobs, 1), aggregate=args.aggregate)
+        elif args.file:
+            cognito.process_stream(args.file, multiline=args.multiline)
+        elif args.error == '-':
+            cognito.process_stream('-', multiline=args.multiline)
+        elif args.error:
+            cognito.process_error(args.error)
+        else:
+            cognito.run_interactive()
+    finally:
+        cognito.close_output()
+        cognito.close_similarity()
+        cognito.close_history()
     
-    if args.interactive:
-        cognito.run_interactive()
-    elif args.error:
-        cognito.process_error(args.error)
-    else:
-        cognito.run_interactive()
+    if args.cache:
+        cognito.save_cache(args.cache)
+    if cognito.stats is not None:
+        print(cognito.stats.format_report(), file=sys.stderr)
+    if cognito.failed and args.format != 'text':
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
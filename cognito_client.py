@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Minimal client for a running `cognito --serve` daemon
+
+Imports nothing heavier than socket and json so shell hooks stay fast, e.g.:
+
+    command_not_found_handle() {
+        python3 /path/to/cognito_client.py "bash: $1: command not found"
+        return 127
+    }
+"""
+import json
+import os
+import socket
+import sys
+
+CONNECT_TIMEOUT = 2.0
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'cognito.sock')
+    return f"/tmp/cognito-{os.getuid()}.sock"
+
+
+def check_owner(socket_path: str):
+    """Refuse a socket another user created, e.g. one bound first at the predictable /tmp path
+
+    Such a daemon would read every failed command and could answer with
+    harmful "solutions".
+    """
+    owner = os.stat(socket_path).st_uid
+    if owner != os.getuid():
+        raise PermissionError(f"{socket_path} belongs to uid {owner}, not to this user")
+
+
+def request(payload: dict, socket_path: str = None, timeout: float = CONNECT_TIMEOUT) -> dict:
+    """Send one request to the daemon and return its reply"""
+    socket_path = socket_path or default_socket_path()
+    check_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload).encode() + b'\n')
+        with sock.makefile('rb') as reply:
+            line = reply.readline()
+    if not line:
+        raise ConnectionError("daemon closed the connection")
+    return json.loads(line)
+
+
+def explain(message: str, socket_path: str = None, output_format: str = 'json'):
+    """Return the daemon's analysis of one message"""
+    reply = request({'message': message, 'format': output_format}, socket_path)
+    if 'error' in reply:
+        raise RuntimeError(reply['error'])
+    return reply['result']
+
+
+def explain_many(messages: list, socket_path: str = None, output_format: str = 'json') -> list:
+    """Return the daemon's analyses of a batch of messages in one round trip"""
+    reply = request({'messages': list(messages), 'format': output_format}, socket_path)
+    if 'error' in reply:
+        raise RuntimeError(reply['error'])
+    return reply['results']
+
+
+def main(argv=None, socket_path: str = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: cognito_client.py <error message>", file=sys.stderr)
+        return 2
+    try:
+        print(explain(' '.join(argv), socket_path, output_format='text'))
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Error: cognito daemon unavailable: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
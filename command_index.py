@@ -0,0 +1,180 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+DEFAULT_COMMAND_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'cognito', 'commands.json')
+INDEX_VERSION = 1
+MAX_DISTANCE = 2
+MAX_SUGGESTIONS = 3
+MAX_MEMO = 10000
+REFRESH_INTERVAL = 5.0
+# Commands worth suggesting even when they are not installed here
+KNOWN_COMMANDS = (
+    'apt', 'apt-get', 'awk', 'bash', 'cargo', 'cat', 'cd', 'chmod', 'chown', 'clang', 'cmake', 'cp', 'curl',
+    'diff', 'docker', 'dpkg', 'du', 'echo', 'find', 'gcc', 'gem', 'git', 'go', 'gradle', 'grep', 'gzip', 'head',
+    'htop', 'java', 'javac', 'jq', 'kill', 'kubectl', 'less', 'ln', 'ls', 'make', 'man', 'mkdir', 'mv', 'mvn',
+    'nano', 'node', 'npm', 'npx', 'perl', 'php', 'ping', 'pip', 'pip3', 'ps', 'python', 'python3', 'rm',
+    'rsync', 'ruby', 'rustc', 'scp', 'sed', 'snap', 'ssh', 'sudo', 'systemctl', 'tail', 'tar', 'top', 'touch',
+    'tmux', 'unzip', 'vim', 'wget', 'which', 'yarn', 'zip',
+)
+
+
+def typo_distance(first: str, second: str) -> int:
+    """Edit distance that counts swapping two adjacent letters ('gti' for 'git') as one edit"""
+    rows = [list(range(len(second) + 1))]
+    for row in range(1, len(first) + 1):
+        current = [row] + [0] * len(second)
+        for column in range(1, len(second) + 1):
+            cost = first[row - 1] != second[column - 1]
+            current[column] = min(rows[-1][column] + 1, current[column - 1] + 1, rows[-1][column - 1] + cost)
+            if (row > 1 and column > 1 and first[row - 1] == second[column - 2]
+                    and first[row - 2] == second[column - 1]):
+                current[column] = min(current[column], rows[-2][column - 2] + 1)
+        rows.append(current)
+    return rows[-1][-1]
+
+
+def deletes(word: str) -> Set[str]:
+    """The word and every string left after deleting one of its characters"""
+    return {word}.union(word[:position] + word[position + 1:] for position in range(len(word)))
+
+
+def neighbours(word: str, words: Set[str], alphabet: str) -> Set[str]:
+    """Words that share a one-character deletion with word, found by lookups in the set
+
+    Two words meet when deleting at most one character from each makes them
+    equal, which covers every single insertion, deletion, substitution and
+    adjacent swap. Inserting each character of the alphabet into every
+    deletion of the query reaches exactly those words, so no index has to be
+    built before the first lookup.
+    """
+    found = set()
+    for key in deletes(word):
+        if key in words:
+            found.add(key)
+        for position in range(len(key) + 1):
+            head, tail = key[:position], key[position:]
+            found.update(candidate for candidate in (head + character + tail for character in alphabet)
+                         if candidate in words)
+    return found
+
+
+def _executables(directory: str) -> List[str]:
+    names = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mode & 0o111:
+                        names.append(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return sorted(names)
+
+
+def _mtime(directory: str) -> Optional[int]:
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+class CommandIndex:
+    """Executables on PATH plus KNOWN_COMMANDS, searched for near misses of a mistyped command
+
+    Directory listings are cached on disk with their mtimes, so opening the
+    index only stats the PATH directories and relists the ones that
+    changed. Long-running processes repeat that check at most every
+    REFRESH_INTERVAL seconds.
+    """
+
+    def __init__(self, path: str = DEFAULT_COMMAND_INDEX_PATH, search_path: Optional[str] = None):
+        self.path = path
+        self.search_path = search_path
+        # directory -> [mtime_ns, names]
+        self.listings: Dict[str, list] = {}
+        self.words: Set[str] = set()
+        self.alphabet = ''
+        self.installed: Set[str] = set()
+        self.memo: Dict[str, List[Tuple[str, bool]]] = {}
+        self.checked = 0.0
+        self._load()
+        if self.refresh():
+            self._save()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as handle:
+                data = json.load(handle)
+            if data.get('version') == INDEX_VERSION:
+                self.listings = data['listings']
+        except (OSError, ValueError, KeyError, TypeError):
+            self.listings = {}
+
+    def refresh(self) -> bool:
+        """Relist PATH directories that changed; returns True if any listing changed"""
+        search_path = self.search_path if self.search_path is not None else os.environ.get('PATH', '')
+        changed = False
+        listings = {}
+        for directory in search_path.split(os.pathsep):
+            if not directory or directory in listings:
+                continue
+            mtime = _mtime(directory)
+            cached = self.listings.get(directory)
+            if cached is not None and cached[0] == mtime:
+                listings[directory] = cached
+            else:
+                listings[directory] = [mtime, _executables(directory) if mtime is not None else []]
+                changed = True
+        changed = changed or listings.keys() != self.listings.keys()
+        self.listings = listings
+        self.installed = {name for _, names in listings.values() for name in names}
+
+        words = self.installed.union(KNOWN_COMMANDS)
+        if words != self.words:
+            self.words = words
+            self.alphabet = ''.join(sorted(set(''.join(words))))
+            self.memo.clear()
+        self.checked = time.monotonic()
+        return changed
+
+    def _save(self):
+        directory = os.path.dirname(self.path)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temp_path, 'w', encoding='utf-8') as handle:
+                json.dump({'version': INDEX_VERSION, 'listings': self.listings}, handle)
+            os.replace(temp_path, self.path)
+        except OSError:
+            # A read-only cache only costs the next run a rescan
+            pass
+
+    def suggest(self, command: str, limit: int = MAX_SUGGESTIONS) -> List[Tuple[str, bool]]:
+        """Nearest real commands to a mistyped one as (name, installed), closest first"""
+        if time.monotonic() - self.checked >= REFRESH_INTERVAL and self.refresh():
+            self._save()
+        if command in self.memo:
+            return self.memo[command]
+        if command in self.words:
+            # A real command that is missing here is not a typo
+            return []
+        if len(self.memo) >= MAX_MEMO:
+            self.memo.clear()
+        ranked = sorted((typo_distance(command, word), word not in self.installed, word)
+                        for word in neighbours(command, self.words, self.alphabet) if word != command)
+        found = self.memo[command] = [(word, not missing) for distance, missing, word in ranked[:limit]
+                                      if distance <= MAX_DISTANCE]
+        return found
+
+
+def open_command_index(path: str = DEFAULT_COMMAND_INDEX_PATH) -> Optional[CommandIndex]:
+    """The command index for the current PATH, or None if it cannot be built"""
+    try:
+        return CommandIndex(path)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,191 @@
+import datetime
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from report import _ISO_TIMESTAMP, _SYSLOG_TIMESTAMP
+
+DEFAULT_INCIDENT_WINDOW = 300
+DEFAULT_MAX_OPEN = 10000
+# A source that never goes quiet still reports an incident every this many windows
+MAX_SPAN_WINDOWS = 12
+KEY_FIELDS = ('host', 'process', 'session', 'none')
+# Upstream failures first: a resolver failure breaks apt fetches, which leave dependencies unmet
+CAUSE_ORDER = ('network_error', 'apt_repository', 'dependency_error', 'permission_denied',
+               'file_not_found', 'command_not_found', 'syntax_error')
+SEVERITY_RANK = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+MONTHS = {name: index for index, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'))}
+
+# "host process[pid]:" after a timestamp, as syslog writes it
+_SOURCE_RE = re.compile(r"\S*\s+([\w.-]+)\s+([^\s:\[]+)(?:\[(\d+)\])?:")
+
+
+def event_time(line: str) -> Tuple[Optional[float], str]:
+    """Seconds encoded by a line's leading ISO or syslog timestamp and the timestamp text, or (None, '')"""
+    match = _ISO_TIMESTAMP.match(line)
+    if match is not None:
+        day = datetime.date.fromisoformat(match.group(1)).toordinal()
+    else:
+        match = _SYSLOG_TIMESTAMP.match(line)
+        if match is None:
+            return None, ''
+        # Syslog has no year; month and day still order events within one
+        month, _, day_of_month = match.group(1).partition(' ')
+        day = MONTHS.get(month, 0) * 31 + int(day_of_month)
+    hours, minutes, seconds = match.group(2, 3, 4)
+    return day * 86400 + int(hours) * 3600 + int(minutes) * 60 + int(seconds), match.group(0).lstrip('[')
+
+
+def event_key(line: str, key_by: str) -> str:
+    """The host, process or session (process and pid on a host) a syslog-style line came from"""
+    if key_by == 'none':
+        return ''
+    match = _ISO_TIMESTAMP.match(line) or _SYSLOG_TIMESTAMP.match(line)
+    source = _SOURCE_RE.match(line, match.end()) if match else None
+    if source is None:
+        return ''
+    host, process, pid = source.groups()
+    if key_by == 'host':
+        return host
+    if key_by == 'process':
+        return f"{host}/{process}"
+    return f"{host}/{process}[{pid or ''}]"
+
+
+class Incident:
+    """Events from one source whose gaps never exceed the window"""
+
+    __slots__ = ('key', 'start', 'end', 'first_seen', 'last_seen', 'events', 'types')
+
+    def __init__(self, key: str, time: float, stamp: str):
+        self.key = key
+        self.start = self.end = time
+        self.first_seen = self.last_seen = stamp
+        self.events = 0
+        # error_type -> [count, first time, first message]
+        self.types: Dict[str, list] = {}
+
+    def add(self, time: float, stamp: str, error_type: str, message: str):
+        if time >= self.end:
+            self.end = time
+            self.last_seen = stamp or self.last_seen
+        self.events += 1
+        entry = self.types.get(error_type)
+        if entry is None:
+            self.types[error_type] = [1, time, message]
+        else:
+            entry[0] += 1
+
+
+class IncidentCorrelator:
+    """Streaming join of classified events into incidents per source
+
+    An incident stays open while events from its source keep arriving
+    within window seconds of each other. Open incidents are kept in order
+    of last activity, so each event only has to close incidents at the
+    front of that order; at most max_open are held at once, the least
+    recently active being closed early when a new source appears, and an
+    incident is cut after MAX_SPAN_WINDOWS windows so busy sources still
+    report. Lines without a timestamp take the time of the last one that
+    had one.
+    """
+
+    def __init__(self, parser, generator, window: int = DEFAULT_INCIDENT_WINDOW, key_by: str = 'host',
+                 max_open: int = DEFAULT_MAX_OPEN):
+        if key_by not in KEY_FIELDS:
+            raise ValueError(f"unknown correlation key '{key_by}', expected one of: {', '.join(KEY_FIELDS)}")
+        self.parser = parser
+        self.generator = generator
+        self.window = window
+        self.key_by = key_by
+        self.max_open = max_open
+        self.open: 'OrderedDict[str, Incident]' = OrderedDict()
+        self.clock = 0.0
+        self.lines = 0
+
+    def add(self, line: str) -> List[Dict[str, Any]]:
+        """Add one log line, returning any incidents it closes"""
+        self.lines += 1
+        time, stamp = event_time(line)
+        if time is not None:
+            self.clock = max(self.clock, time)
+        closed = self.expire(self.clock)
+
+        error_type = self.parser.parse_error(line)['error_type']
+        if error_type == 'unknown':
+            return closed
+        key = event_key(line, self.key_by)
+        incident = self.open.get(key)
+        if incident is not None and self.clock - incident.start > self.window * MAX_SPAN_WINDOWS:
+            del self.open[key]
+            closed.append(self.summarize(incident))
+            incident = None
+        if incident is None:
+            if len(self.open) >= self.max_open:
+                closed.append(self.summarize(self.open.popitem(last=False)[1]))
+            incident = self.open[key] = Incident(key, self.clock, stamp)
+        else:
+            self.open.move_to_end(key)
+        incident.add(self.clock, stamp, error_type, line)
+        return closed
+
+    def expire(self, now: float) -> List[Dict[str, Any]]:
+        """Close incidents idle for longer than the window"""
+        closed = []
+        while self.open:
+            incident = next(iter(self.open.values()))
+            if now - incident.end <= self.window:
+                break
+            del self.open[incident.key]
+            closed.append(self.summarize(incident))
+        return closed
+
+    def flush(self) -> List[Dict[str, Any]]:
+        closed = [self.summarize(incident) for incident in self.open.values()]
+        self.open.clear()
+        return closed
+
+    def correlate(self, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        for line in lines:
+            yield from self.add(line)
+        yield from self.flush()
+
+    def _cause_rank(self, item: Tuple[str, list]) -> tuple:
+        error_type, (_, first_time, _) = item
+        rank = CAUSE_ORDER.index(error_type) if error_type in CAUSE_ORDER else len(CAUSE_ORDER)
+        severity = SEVERITY_RANK.get(self.generator.assess_severity(error_type), len(SEVERITY_RANK))
+        return rank, severity, first_time
+
+    def summarize(self, incident: Incident) -> Dict[str, Any]:
+        """An incident as plain data, error types ordered from likely root cause to symptoms"""
+        ordered = sorted(incident.types.items(), key=self._cause_rank)
+        error_types = [{'error_type': error_type, 'severity': self.generator.assess_severity(error_type),
+                        'count': count, 'first_message': message}
+                       for error_type, (count, _, message) in ordered]
+        root = error_types[0]
+        severity = min((entry['severity'] for entry in error_types),
+                       key=lambda name: SEVERITY_RANK.get(name, len(SEVERITY_RANK)))
+        return {
+            'key': incident.key,
+            'first_seen': incident.first_seen,
+            'last_seen': incident.last_seen,
+            'duration': incident.end - incident.start,
+            'events': incident.events,
+            'severity': severity,
+            'root_cause': root['error_type'],
+            'summary': self.generator.knowledge_base.get_knowledge(root['error_type'])['summary'],
+            'error_types': error_types
+        }
+
+
+def format_incident(incident: Dict[str, Any]) -> str:
+    """Render an incident as text"""
+    source = f" on {incident['key']}" if incident['key'] else ""
+    since = f" from {incident['first_seen']}" if incident['first_seen'] else ""
+    lines = [f"\n[{incident['severity'].upper()}] Incident{source}{since}: "
+             f"{incident['events']} events over {incident['duration']:.0f}s",
+             f"   Root cause: {incident['root_cause'].replace('_', ' ').title()} - {incident['summary']}"]
+    for entry in incident['error_types']:
+        lines.append(f"   {entry['count']}x {entry['error_type'].replace('_', ' ')}: {entry['first_message']}")
+    return "\n".join(lines)
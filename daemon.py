@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+import signal
+import stat
+import sys
+import time
+from typing import Any, Dict, List
+
+from cognito_client import default_socket_path
+from render import format_explanation
+
+MAX_REQUEST_BYTES = 4 << 20
+MAX_BATCH = 10000
+# Batches yield to the event loop after this many messages so other clients are not starved
+YIELD_EVERY = 100
+PACK_CHECK_INTERVAL = 1.0
+
+
+class CognitoServer:
+    """Serves analyses from one warm Cognito instance over a Unix domain socket
+
+    The protocol is one JSON object per line in each direction. A request holds
+    either "message" or a "messages" batch, plus an optional "format" of "json"
+    (the default) or "text" and an "id" echoed back in the reply.
+    """
+
+    def __init__(self, cognito, socket_path: str = None):
+        self.cognito = cognito
+        self.socket_path = socket_path or default_socket_path()
+        self.requests = 0
+        self.last_pack_check = time.monotonic()
+
+    def check_packs(self, force: bool = False):
+        """Hot-reload changed knowledge packs, at most once per PACK_CHECK_INTERVAL"""
+        now = time.monotonic()
+        if not force and now - self.last_pack_check < PACK_CHECK_INTERVAL:
+            return
+        self.last_pack_check = now
+        try:
+            if self.cognito.reload_packs():
+                print("Knowledge packs reloaded", file=sys.stderr, flush=True)
+        except (OSError, ValueError) as e:
+            print(f"Error: keeping previous knowledge packs: {e}", file=sys.stderr, flush=True)
+
+    def analyze(self, message: str, output_format: str) -> Any:
+        parsed_error = self.cognito.parser.parse_error(message)
+        explanation = self.cognito.generator.generate_explanation(parsed_error)
+        self.cognito.interaction_count += 1
+        return format_explanation(explanation) if output_format == 'text' else explanation
+
+    async def analyze_batch(self, messages: List[str], output_format: str) -> List[Any]:
+        """Analyze a batch, letting other clients' requests run between chunks"""
+        results = []
+        for start in range(0, len(messages), YIELD_EVERY):
+            chunk = messages[start:start + YIELD_EVERY]
+            results.extend(self.analyze(message, output_format) for message in chunk)
+            await asyncio.sleep(0)
+        return results
+
+    async def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one decoded request"""
+        output_format = request.get('format', 'json')
+        if output_format not in ('json', 'text'):
+            return {'error': f"unknown format: {output_format}"}
+
+        reply = {}
+        if 'id' in request:
+            reply['id'] = request['id']
+        if 'messages' in request:
+            messages = request['messages']
+            if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+                reply['error'] = "'messages' must be a list of strings"
+            elif len(messages) > MAX_BATCH:
+                reply['error'] = f"batch larger than {MAX_BATCH} messages"
+            else:
+                reply['results'] = await self.analyze_batch(messages, output_format)
+        elif isinstance(request.get('message'), str):
+            reply['result'] = self.analyze(request['message'], output_format)
+        else:
+            reply['error'] = "request needs 'message' or 'messages'"
+        return reply
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    writer.write(b'{"error": "request too large"}\n')
+                    break
+                if not line:
+                    break
+                self.requests += 1
+                self.check_packs()
+                try:
+                    request = json.loads(line)
+                    if isinstance(request, dict):
+                        reply = await self.handle_request(request)
+                    else:
+                        reply = {'error': 'request must be an object'}
+                except ValueError as e:
+                    reply = {'error': f"invalid JSON: {e}"}
+                except Exception as e:
+                    reply = {'error': str(e)}
+                # An idle daemon must not hold recorded analyses back
+                self.cognito.flush_history()
+                writer.write(json.dumps(reply).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def remove_stale_socket(self):
+        """Remove a socket left behind by a daemon that died, refusing to replace a live one"""
+        try:
+            mode = os.lstat(self.socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise OSError(f"{self.socket_path} exists and is not a socket")
+        try:
+            _, writer = await asyncio.open_unix_connection(self.socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(self.socket_path)
+            return
+        writer.close()
+        raise OSError(f"a Cognito daemon is already listening on {self.socket_path}")
+
+    async def serve(self):
+        """Listen until SIGINT or SIGTERM"""
+        await self.remove_stale_socket()
+        # Create the socket owner-only from the start rather than narrowing it after bind
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path,
+                                                     limit=MAX_REQUEST_BYTES)
+        finally:
+            os.umask(umask)
+        print(f"Cognito daemon listening on {self.socket_path}", flush=True)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        loop.add_signal_handler(signal.SIGHUP, self.check_packs, True)
+
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def serve(cognito, socket_path: str = None):
+    """Run the daemon in the foreground"""
+    server = CognitoServer(cognito, socket_path)
+    try:
+        asyncio.run(server.serve())
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -2,6 +2,43 @@ import re
 from typing import Dict, Any
 from datetime import datetime
 
+from pattern_engine import PatternEngine, PatternMatch, is_linear
+
+_REPO_RE = re.compile(r"'([^']+)'")
+# The word boundary keeps a long unbroken word from being rescanned at every offset
+_DISTRO_RE = re.compile(r'\b(\w+)\s+Release')
+_COMMAND_QUOTED_RE = re.compile(r"Command '([^']+)'")
+_COMMAND_SHELL_RE = re.compile(r"(?:bash|zsh): ([^:]+): command not found")
+_COMMAND_LOOSE_RE = re.compile(r"(?:can'?t find|command not found).*?([a-zA-Z0-9_-]+)")
+_FILE_QUOTED_RE = re.compile(r"'(.*?)'")
+_FILE_ACCESS_RE = re.compile(r"cannot access (.+?):")
+_FILE_LOOSE_RE = re.compile(r"(?:file|open).*?([a-zA-Z0-9_./-]+)")
+_RESOURCE_RE = re.compile(r"(?:access|open|execute).*?([a-zA-Z0-9_./-]+)")
+
+DEFAULT_MAX_LINE_LENGTH = 8192
+
+
+def _search_line_starts(regex: re.Pattern, literal: str, message: str):
+    """regex.search for a pattern that starts with literal, trying one occurrence per line
+    
+    If the pattern fails at the first occurrence on a line it fails at every
+    later one on that line too, so this avoids rescanning a line with many
+    repeats of the literal once per repeat.
+    """
+    start = message.find(literal)
+    while start >= 0:
+        found = regex.match(message, start)
+        if found:
+            return found
+        newline = message.find('\n', start)
+        if newline < 0:
+            return None
+        start = message.find(literal, newline + 1)
+    return None
+
+# Error types extract_components can find anything for
+COMPONENT_TYPES = frozenset(('apt_repository', 'command_not_found', 'file_not_found', 'permission_denied'))
+
 class ErrorParser:
     def __init__(self):
         self.patterns = {
@@ -103,73 +140,101 @@ class ErrorParser:
                 r"command.*missing"
             ]
         }
+
+        self.literal_cache = {}
+        self._engine = None
+        self.max_line_length = None
+    
+    def harden(self, max_line_length: int = DEFAULT_MAX_LINE_LENGTH):
+        """Bound matching cost on huge or adversarial lines
+        
+        Lines longer than max_line_length are cut down to their head and tail,
+        and literal-and-gap patterns are matched without regex backtracking.
+        Raises ValueError if a pattern, such as one from a knowledge pack,
+        could still backtrack.
+        """
+        for table in (self.patterns, self.natural_patterns):
+            for patterns in table.values():
+                for pattern in patterns:
+                    if not is_linear(pattern):
+                        raise ValueError(f"pattern {pattern!r} may backtrack on untrusted input; hardened "
+                                         "matching only allows literals, bounded repeats and .* or .+ gaps")
+        self.max_line_length = max(max_line_length, 2)
+        self._engine = None
+        return self
+    
+    def window(self, error_message: str) -> str:
+        """The part of a message that is matched: all of it, or its head and tail when too long"""
+        limit = self.max_line_length
+        if limit is None or len(error_message) <= limit:
+            return error_message
+        head = limit // 2
+        return error_message[:head] + '\n' + error_message[len(error_message) - (limit - head - 1):]
+    
+    @property
+    def engine(self) -> PatternEngine:
+        """Compiled matcher for the pattern tables, built on first use"""
+        if self._engine is None:
+            self._engine = PatternEngine(self.natural_patterns, self.patterns,
+                                         literal_cache=self.literal_cache,
+                                         linear=self.max_line_length is not None)
+        return self._engine
     
     def parse_error(self, error_message: str) -> Dict[str, Any]:
         """Parse error message and extract structured information"""
-        error_type = self.classify_error(error_message)
+        text = self.window(error_message)
+        match = self.engine.match(text)
+        error_type = match.error_type
         
         return {
             'original_message': error_message,
             'error_type': error_type,
-            'components': self.extract_components(error_message, error_type),
-            'confidence': self.calculate_confidence(error_message, error_type),
+            'components': self.extract_components(text, error_type),
+            'confidence': self.confidence_from_match(match, error_type),
             'timestamp': datetime.now().isoformat()
         }
     
     def classify_error(self, error_message: str) -> str:
         """Classify the error type based on patterns"""
-        error_lower = error_message.lower()
-        
-      
-        for error_type, patterns in self.natural_patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, error_lower, re.IGNORECASE):
-                    return error_type
-        
-       
-        for error_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                if re.search(pattern, error_message, re.IGNORECASE):
-                    return error_type
-        
-        return 'unknown'
+        return self.engine.match(self.window(error_message)).error_type
     
     def extract_components(self, error_message: str, error_type: str) -> Dict[str, str]:
         """Extract specific components from the error message"""
         components = {}
+        error_message = self.window(error_message)
         
         if error_type == 'apt_repository':
-            repo_match = re.search(r"'([^']+)'", error_message)
+            repo_match = _REPO_RE.search(error_message)
             if repo_match:
                 components['repository'] = repo_match.group(1)
             
-            distro_match = re.search(r'(\w+)\s+Release', error_message)
+            distro_match = _DISTRO_RE.search(error_message)
             if distro_match:
                 components['distribution'] = distro_match.group(1)
         
         elif error_type == 'command_not_found':
-            cmd_match = re.search(r"Command '([^']+)'", error_message)
+            cmd_match = _COMMAND_QUOTED_RE.search(error_message)
             if not cmd_match:
-                cmd_match = re.search(r"(?:bash|zsh): ([^:]+): command not found", error_message)
+                cmd_match = _COMMAND_SHELL_RE.search(error_message)
             if not cmd_match:
                 
-                cmd_match = re.search(r"(?:can'?t find|command not found).*?([a-zA-Z0-9_-]+)", error_message.lower())
+                cmd_match = _COMMAND_LOOSE_RE.search(error_message.lower())
             if cmd_match:
                 components['command'] = cmd_match.group(1)
         
         elif error_type == 'file_not_found':
-            file_match = re.search(r"'(.*?)'", error_message)
+            file_match = _FILE_QUOTED_RE.search(error_message)
             if not file_match:
-                file_match = re.search(r"cannot access (.+?):", error_message)
+                file_match = _search_line_starts(_FILE_ACCESS_RE, 'cannot access ', error_message)
             if not file_match:
                
-                file_match = re.search(r"(?:file|open).*?([a-zA-Z0-9_./-]+)", error_message.lower())
+                file_match = _FILE_LOOSE_RE.search(error_message.lower())
             if file_match:
                 components['filename'] = file_match.group(1)
         
         elif error_type == 'permission_denied':
             
-            access_match = re.search(r"(?:access|open|execute).*?([a-zA-Z0-9_./-]+)", error_message.lower())
+            access_match = _RESOURCE_RE.search(error_message.lower())
             if access_match:
                 components['resource'] = access_match.group(1)
         
@@ -177,24 +242,16 @@ class ErrorParser:
     
     def calculate_confidence(self, error_message: str, error_type: str) -> float:
         """Calculate confidence score for the classification"""
+        if error_type == 'unknown':
+            return 0.3
+        return self.confidence_from_match(self.engine.match(self.window(error_message)), error_type)
+    
+    def confidence_from_match(self, match: PatternMatch, error_type: str) -> float:
+        """Score a classification from the pattern hits of a single engine pass"""
         if error_type == 'unknown':
             return 0.3
         
-        error_lower = error_message.lower()
-        
-        
-        technical_matches = 0
-        if error_type in self.patterns:
-            for pattern in self.patterns[error_type]:
-                if re.search(pattern, error_message, re.IGNORECASE):
-                    technical_matches += 1
-        
-        
-        natural_matches = 0
-        if error_type in self.natural_patterns:
-            for pattern in self.natural_patterns[error_type]:
-                if re.search(pattern, error_lower, re.IGNORECASE):
-                    natural_matches += 1
+        technical_matches, natural_matches = match.counts(error_type)
         
         if technical_matches > 0:
             return min(0.3 + (technical_matches * 0.2) + (natural_matches * 0.1), 0.95)
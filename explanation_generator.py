@@ -1,11 +1,99 @@
-from knowledge_base import KnowledgeBase
+from knowledge_base import get_shared_knowledge_base
+
+SEVERITY_MAP = {
+    'apt_repository': 'medium',
+    'permission_denied': 'low',
+    'command_not_found': 'low', 
+    'file_not_found': 'low',
+    'syntax_error': 'low',
+    'dependency_error': 'high',
+    'network_error': 'medium',
+    'unknown': 'unknown'
+}
+
+MIN_RELATED_SCORE = 1.5
 
 class ExplanationGenerator:
-    def __init__(self):
-        self.knowledge_base = KnowledgeBase()
+    def __init__(self, knowledge_base=None, parser=None):
+        self.knowledge_base = knowledge_base or get_shared_knowledge_base()
+        self.severity_map = dict(SEVERITY_MAP)
+        self.parser = parser
+        self._knowledge_index = None
+        self.package_index_path = None
+        self._package_index = None
+        self._command_index = None
+    
+    @property
+    def knowledge_index(self):
+        """BM25 index over the knowledge base and pattern text, built on first use"""
+        if self._knowledge_index is None:
+            from knowledge_index import KnowledgeIndex
+            
+            self._knowledge_index = KnowledgeIndex(self.knowledge_base, self.parser)
+        return self._knowledge_index
+    
+    @property
+    def package_index(self):
+        """Command-to-package index built by --build-package-index, or None if there is none"""
+        if self._package_index is None:
+            from package_index import open_index, DEFAULT_INDEX_PATH
+            
+            self._package_index = open_index(self.package_index_path or DEFAULT_INDEX_PATH) or False
+        return self._package_index or None
+    
+    @property
+    def command_index(self):
+        """Typo index over the commands on PATH, or None if it cannot be built"""
+        if self._command_index is None:
+            from command_index import open_command_index
+            
+            self._command_index = open_command_index() or False
+        return self._command_index or None
+    
+    def similar_commands(self, command: str) -> list:
+        """Real commands the given one is probably a typo of, as (name, installed) pairs"""
+        index = self.command_index
+        return index.suggest(command) if index is not None else []
     
-    def generate_explanation(self, parsed_error: dict) -> dict:
-        """Generate a comprehensive explanation for the parsed error"""
+    def packages_for(self, command: str) -> list:
+        """Packages known to provide command; installed ones come first and start with '*'"""
+        index = self.package_index
+        return index.lookup(command) if index is not None else []
+    
+    def related_errors(self, error_message: str, limit: int = 3) -> list:
+        """Rank known error types by textual similarity to an unclassified message"""
+        return self._related(self.knowledge_index.search(error_message, limit))
+    
+    def _related(self, ranked: list) -> list:
+        return [
+            {'error_type': error_type, 'score': round(score, 2)}
+            for error_type, score in ranked
+            if score >= MIN_RELATED_SCORE
+        ]
+    
+    def _related_text(self, parsed_error: dict):
+        """The text to rank related error types by, or None when the error was classified"""
+        if parsed_error['error_type'] != 'unknown' or not parsed_error.get('original_message'):
+            return None
+        message = parsed_error['original_message']
+        return self.parser.window(message) if self.parser is not None else message
+    
+    def generate_explanations(self, parsed_errors: list) -> list:
+        """Explain a batch, ranking related types for all of its unknown messages in one search"""
+        explanations = [self.generate_explanation(parsed_error, related=False) for parsed_error in parsed_errors]
+        unknown = [(explanation, text) for explanation, text in
+                   zip(explanations, map(self._related_text, parsed_errors)) if text is not None]
+        if unknown:
+            ranked = self.knowledge_index.search_many(text for _, text in unknown)
+            for (explanation, _), found in zip(unknown, ranked):
+                explanation['related_errors'] = self._related(found)
+        return explanations
+    
+    def generate_explanation(self, parsed_error: dict, related: bool = True) -> dict:
+        """Generate a comprehensive explanation for the parsed error
+        
+        With related=False, unknown errors get no related_errors ranking.
+        """
         error_type = parsed_error['error_type']
         components = parsed_error['components']
         knowledge = self.knowledge_base.get_knowledge(error_type)
@@ -21,7 +109,7 @@ class ExplanationGenerator:
             components
         )
         
-        return {
+        explanation = {
             'error_type': error_type,
             'severity': self.assess_severity(error_type),
             'summary': knowledge['summary'],
@@ -31,20 +119,16 @@ class ExplanationGenerator:
             'learn_more': knowledge['learn_more'],
             'confidence': parsed_error['confidence']
         }
+        
+        text = self._related_text(parsed_error) if related else None
+        if text is not None:
+            explanation['related_errors'] = self.related_errors(text)
+        
+        return explanation
     
     def assess_severity(self, error_type: str) -> str:
         """Assess the severity of the error"""
-        severity_map = {
-            'apt_repository': 'medium',
-            'permission_denied': 'low',
-            'command_not_found': 'low', 
-            'file_not_found': 'low',
-            'syntax_error': 'low',
-            'dependency_error': 'high',
-            'network_error': 'medium',
-            'unknown': 'unknown'
-        }
-        return severity_map.get(error_type, 'unknown')
+        return self.severity_map.get(error_type, 'unknown')
     
     def customize_cause(self, common_causes: list, components: dict) -> str:
         """Choose and customize the most likely cause based on error context"""
@@ -53,6 +137,8 @@ class ExplanationGenerator:
         
         # Default to first cause
         cause = common_causes[0]
+        if not components:
+            return cause
         
         # Customize based on components
         if 'repository' in components:
@@ -66,9 +152,11 @@ class ExplanationGenerator:
         
         return cause
     
-    def customize_solutions(self, base_solutions: list, components: dict) -> list:
+    def customize_solutions(self, base_solutions, components: dict) -> list:
         """Customize solutions based on specific error components"""
-        solutions = base_solutions.copy()
+        solutions = list(base_solutions)
+        if not components:
+            return solutions
         
         if 'repository' in components:
             repo_solution = f"Remove this specific repository: sudo add-apt-repository --remove '{components['repository']}'"
@@ -76,7 +164,35 @@ class ExplanationGenerator:
                 solutions.insert(1, repo_solution)
         
         elif 'command' in components:
-            cmd_solution = f"Install package containing '{components['command']}': sudo apt install {components['command']}"
+            command = components['command']
+            packages = self.packages_for(command)
+            installed = [package[1:] for package in packages if package.startswith('*')]
+            if installed:
+                cmd_solution = f"'{command}' comes from the installed package {installed[0]}; check that its directory is in PATH: echo $PATH"
+            elif packages:
+                cmd_solution = f"Install package containing '{command}': sudo apt install {packages[0]}"
+                if len(packages) > 1:
+                    solutions.insert(0, f"Other packages providing '{command}': {', '.join(packages[1:4])}")
+            else:
+                similar = self.similar_commands(command)
+                if self.package_index is not None:
+                    cmd_solution = f"No package in the package index provides '{command}'; check the spelling"
+                elif not similar:
+                    # Guessing the package from the command name only makes sense without an index to ask
+                    cmd_solution = f"Install package containing '{command}': sudo apt install {command}"
+                if similar:
+                    # No package provides the name, so a typo is the more likely story
+                    if self.package_index is not None:
+                        solutions.insert(0, cmd_solution)
+                    name, name_installed = similar[0]
+                    cmd_solution = f"Did you mean '{name}'?"
+                    package = (self.packages_for(name) or [None])[0]
+                    if package is None and self.package_index is None:
+                        package = name
+                    if not name_installed and package:
+                        cmd_solution += f" Install it with: sudo apt install {package.lstrip('*')}"
+                    if len(similar) > 1:
+                        solutions.insert(0, f"Other close commands: {', '.join(other for other, _ in similar[1:])}")
             solutions.insert(0, cmd_solution)
         
         elif 'filename' in components:
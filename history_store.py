@@ -0,0 +1,269 @@
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'cognito', 'history.db')
+BATCH_SIZE = 1000
+# Long-running sessions also write a partial batch once it is this old
+FLUSH_INTERVAL = 1.0
+MAX_MESSAGE_LENGTH = 2000
+BUCKET_SECONDS = 3600
+DEFAULT_LIMIT = 10
+PERIOD_UNITS = {'m': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    time INTEGER NOT NULL,
+    error_type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_time ON events (time);
+CREATE INDEX IF NOT EXISTS events_type ON events (error_type, time);
+CREATE INDEX IF NOT EXISTS events_severity ON events (severity, time);
+CREATE TABLE IF NOT EXISTS event_components (
+    event INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_components_value ON event_components (name, value, event);
+CREATE TABLE IF NOT EXISTS type_counts (
+    bucket INTEGER NOT NULL,
+    error_type TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (bucket, error_type, severity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS component_counts (
+    name TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    error_type TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (name, bucket, error_type, value)
+) WITHOUT ROWID;
+"""
+
+
+def parse_period(period: str) -> Optional[int]:
+    """Seconds in a period such as '30m', '24h', '7d' or '2w'; None for 'all'"""
+    if period == 'all':
+        return None
+    match = re.fullmatch(r"(\d+)([mhdw])", period.strip())
+    if match is None:
+        raise ValueError(f"invalid period '{period}', expected e.g. 24h, 7d, 2w or all")
+    return int(match.group(1)) * PERIOD_UNITS[match.group(2)]
+
+
+class HistoryStore:
+    """SQLite store of analyzed errors, written in batches
+
+    Raw events are indexed by time, error type, severity and component
+    value. Hourly counts per error type and per component value are kept
+    up to date at every batch, so summaries over long periods read a few
+    rows per hour instead of every event. Recording is thread-safe, so the
+    threads of a pipeline can share one store.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, batch_size: int = BATCH_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        # WAL lets queries run while another process is recording
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self.pending: List[tuple] = []
+        self.last_flush = time.monotonic()
+
+    def record(self, parsed_error: Dict[str, Any], severity: str, when: Optional[float] = None):
+        event = (int(time.time() if when is None else when), parsed_error['error_type'], severity,
+                 parsed_error['confidence'], parsed_error['original_message'][:MAX_MESSAGE_LENGTH],
+                 parsed_error['components'])
+        with self.lock:
+            self.pending.append(event)
+            if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= FLUSH_INTERVAL:
+                self._flush()
+
+    def flush(self):
+        """Write pending events and fold them into the hourly counts in one transaction"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        type_counts = Counter()
+        component_counts = Counter()
+        components = []
+        with self.connection:
+            cursor = self.connection.cursor()
+            for when, error_type, severity, confidence, message, values in pending:
+                cursor.execute("INSERT INTO events (time, error_type, severity, confidence, message) "
+                               "VALUES (?, ?, ?, ?, ?)", (when, error_type, severity, confidence, message))
+                bucket = when // BUCKET_SECONDS
+                type_counts[bucket, error_type, severity] += 1
+                for name, value in values.items():
+                    components.append((cursor.lastrowid, name, str(value)))
+                    component_counts[name, bucket, error_type, str(value)] += 1
+            cursor.executemany("INSERT INTO event_components (event, name, value) VALUES (?, ?, ?)", components)
+            cursor.executemany(
+                "INSERT INTO type_counts (bucket, error_type, severity, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in type_counts.items()])
+            cursor.executemany(
+                "INSERT INTO component_counts (name, bucket, error_type, value, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT DO UPDATE SET count = count + excluded.count",
+                [key + (count,) for key, count in component_counts.items()])
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.connection.close()
+
+    def _since_bucket(self, since: Optional[int]) -> int:
+        return 0 if since is None else (int(time.time()) - since) // BUCKET_SECONDS
+
+    def type_summary(self, since: Optional[int] = None, severity: Optional[str] = None) -> List[tuple]:
+        """(error type, severity, count) since `since` seconds ago, most frequent first"""
+        query = "SELECT error_type, severity, SUM(count) AS total FROM type_counts WHERE bucket >= ?"
+        params: list = [self._since_bucket(since)]
+        if severity:
+            query += " AND severity = ?"
+            params.append(severity)
+        query += " GROUP BY error_type, severity ORDER BY total DESC"
+        return self.connection.execute(query, params).fetchall()
+
+    def top_components(self, name: str, since: Optional[int] = None, error_type: Optional[str] = None,
+                       limit: int = DEFAULT_LIMIT) -> List[tuple]:
+        """(value, count) of the most frequent values of a component, e.g. commands not found"""
+        query = "SELECT value, SUM(count) AS total FROM component_counts WHERE name = ? AND bucket >= ?"
+        params: list = [name, self._since_bucket(since)]
+        if error_type:
+            query += " AND error_type = ?"
+            params.append(error_type)
+        query += " GROUP BY value ORDER BY total DESC LIMIT ?"
+        params.append(limit)
+        return self.connection.execute(query, params).fetchall()
+
+    def recent(self, since: Optional[int] = None, error_type: Optional[str] = None,
+               severity: Optional[str] = None, component: Optional[tuple] = None,
+               limit: int = DEFAULT_LIMIT) -> List[tuple]:
+        """(time, error type, severity, message) of the latest matching events, newest first"""
+        query = "SELECT time, error_type, severity, message FROM events WHERE time >= ?"
+        params: list = [0 if since is None else int(time.time()) - since]
+        for column, value in (('error_type', error_type), ('severity', severity)):
+            if value:
+                query += f" AND {column} = ?"
+                params.append(value)
+        if component:
+            query += " AND id IN (SELECT event FROM event_components WHERE name = ? AND value = ?)"
+            params.extend(component)
+        query += " ORDER BY time DESC, id DESC LIMIT ?"
+        params.append(limit)
+        return self.connection.execute(query, params).fetchall()
+
+
+class HistoryParser:
+    """ErrorParser front end that records every parsed error in a HistoryStore"""
+
+    def __init__(self, parser, store: HistoryStore, severity: Callable[[str], str]):
+        self.parser = parser
+        self.store = store
+        self.severity = severity
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+    def with_parser(self, parser, generator) -> 'HistoryParser':
+        """The same front end around another parser, rating severity with the new generator"""
+        return HistoryParser(parser, self.store, generator.assess_severity)
+
+    def parse_error(self, error_message: str) -> Dict[str, Any]:
+        parsed_error = self.parser.parse_error(error_message)
+        self.store.record(parsed_error, self.severity(parsed_error['error_type']))
+        return parsed_error
+
+
+def build_arg_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='cognito history', description='Query the history of analyzed errors')
+    parser.add_argument('--db', metavar='PATH', default=DEFAULT_HISTORY_PATH, help='History store to read')
+    parser.add_argument('--since', default='7d', metavar='PERIOD',
+                        help="Only errors from this long ago, e.g. 24h, 7d, 2w or 'all' (default: 7d)")
+    parser.add_argument('--type', metavar='ERROR_TYPE', help='Only this error type, e.g. command_not_found')
+    parser.add_argument('--severity', help='Only this severity')
+    parser.add_argument('--top', metavar='COMPONENT', help='Most frequent values of a component, e.g. command')
+    parser.add_argument('--recent', action='store_true', help='List the latest matching errors')
+    parser.add_argument('--component', metavar='NAME=VALUE', help='With --recent, only errors with this component')
+    parser.add_argument('-n', '--limit', type=int, default=DEFAULT_LIMIT, help='Rows to show (default: 10)')
+    parser.add_argument('--format', choices=('text', 'json'), default='text', help='Output format (default: text)')
+    return parser
+
+
+def main(argv=None) -> int:
+    """Entry point of `cognito history`"""
+    import json
+
+    args = build_arg_parser().parse_args(argv)
+    if not os.path.exists(args.db):
+        print(f"Error: no history at {args.db}; record some with --record", file=sys.stderr)
+        return 1
+    try:
+        since = parse_period(args.since)
+        component = None
+        if args.component:
+            name, separator, value = args.component.partition('=')
+            if not separator:
+                raise ValueError("--component expects NAME=VALUE")
+            component = (name, value)
+        store = HistoryStore(args.db)
+        try:
+            if args.recent:
+                rows = store.recent(since, args.type, args.severity, component, args.limit)
+                result = [{'time': when, 'error_type': error_type, 'severity': severity, 'message': message}
+                          for when, error_type, severity, message in rows]
+                lines = [f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['time']))}  "
+                         f"{entry['error_type']} ({entry['severity']}): {entry['message']}" for entry in result]
+            elif args.top:
+                rows = store.top_components(args.top, since, args.type, args.limit)
+                result = [{'value': value, 'count': count} for value, count in rows]
+                lines = [f"{entry['count']:>8}  {entry['value']}" for entry in result]
+            else:
+                rows = store.type_summary(since, args.severity)
+                if args.type:
+                    rows = [row for row in rows if row[0] == args.type]
+                result = [{'error_type': error_type, 'severity': severity, 'count': count}
+                          for error_type, severity, count in rows]
+                lines = [f"{entry['count']:>8}  {entry['error_type']} ({entry['severity']})" for entry in result]
+        finally:
+            store.close()
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if args.format == 'json':
+        print(json.dumps(result, indent=2))
+    elif lines:
+        print("\n".join(lines))
+    else:
+        print("No matching errors")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -222,4 +222,15 @@ class KnowledgeBase:
         if error_type in base_urls:
             urls.append(base_urls[error_type])
         
-        return urls
\ No newline at end of file
+        return urls
+
+
+_shared_knowledge_base = None
+
+
+def get_shared_knowledge_base() -> KnowledgeBase:
+    """Return the process-wide KnowledgeBase, built once; callers must treat it as read-only"""
+    global _shared_knowledge_base
+    if _shared_knowledge_base is None:
+        _shared_knowledge_base = KnowledgeBase()
+    return _shared_knowledge_base
@@ -0,0 +1,77 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by can could e for from has have in is it its of on or
+that the this to was were will with w you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens plus adjacent-word bigrams"""
+    words = [word for word in _TOKEN_RE.findall(text.lower()) if word not in STOPWORDS and len(word) > 1]
+    return words + [f"{first}_{second}" for first, second in zip(words, words[1:])]
+
+
+class KnowledgeIndex:
+    """BM25 inverted index over knowledge-base entries and their patterns
+
+    Term weights do not depend on the query, so they are computed once at
+    build time and a lookup only touches the postings of its own terms.
+    """
+
+    def __init__(self, knowledge_base, parser=None, k1: float = 1.2, b: float = 0.75):
+        documents = {}
+        for error_type, knowledge in knowledge_base.error_knowledge.items():
+            if error_type == 'unknown':
+                continue
+            parts = [knowledge['summary']]
+            parts.extend(knowledge['common_causes'])
+            parts.extend(knowledge['solutions'])
+            parts.extend(knowledge['prevention_tips'])
+            documents[error_type] = parts
+        if parser is not None:
+            for table in (parser.patterns, parser.natural_patterns):
+                for error_type, patterns in table.items():
+                    if error_type in documents:
+                        documents[error_type].extend(patterns)
+
+        self.error_types = list(documents)
+        term_counts = [Counter(tokenize(' '.join(parts))) for parts in documents.values()]
+        lengths = [sum(counts.values()) for counts in term_counts]
+        average_length = sum(lengths) / len(lengths) if lengths else 1.0
+
+        document_frequency = Counter()
+        for counts in term_counts:
+            document_frequency.update(counts.keys())
+
+        total = len(term_counts)
+        self.postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            norm = k1 * (1 - b + b * lengths[doc_id] / average_length)
+            for term, tf in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                self.postings.setdefault(term, []).append((doc_id, idf * tf * (k1 + 1) / (tf + norm)))
+
+    def search(self, message: str, limit: int = 3) -> List[Tuple[str, float]]:
+        """Return up to limit (error_type, score) pairs, best first"""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(message)):
+            for doc_id, weight in self.postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.error_types[doc_id], score) for doc_id, score in ranked]
+
+    def search_many(self, messages: Iterable[str], limit: int = 3) -> List[List[Tuple[str, float]]]:
+        """Search a batch, scoring each distinct message once"""
+        results = {}
+        ranked = []
+        for message in messages:
+            if message not in results:
+                results[message] = self.search(message, limit)
+            ranked.append(results[message])
+        return ranked
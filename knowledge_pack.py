@@ -0,0 +1,188 @@
+import hashlib
+import json
+import marshal
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from error_parser import ErrorParser
+from explanation_generator import ExplanationGenerator
+from knowledge_base import KnowledgeBase
+from pattern_engine import combine_error, required_literal
+
+PACK_FORMAT = 3
+SEVERITIES = ('low', 'medium', 'high', 'critical', 'unknown')
+LIST_FIELDS = ('patterns', 'natural_patterns', 'common_causes', 'solutions', 'prevention_tips')
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'cognito', 'packs')
+
+
+class KnowledgePackError(ValueError):
+    pass
+
+
+def compile_pack(path: str) -> Dict[str, Any]:
+    """Validate a JSON knowledge pack and convert it to the indexed form used at runtime
+
+    A pack looks like:
+
+        {"name": "internal-tools",
+         "errors": {"terraform_lock": {"patterns": ["Error acquiring the state lock"],
+                                       "natural_patterns": [], "severity": "medium",
+                                       "summary": "...", "common_causes": ["..."],
+                                       "solutions": ["..."], "prevention_tips": [],
+                                       "learn_more": null}}}
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as handle:
+            data = json.load(handle)
+    except ValueError as e:
+        raise KnowledgePackError(f"{path}: invalid JSON: {e}") from e
+    if not isinstance(data, dict) or not isinstance(data.get('errors'), dict):
+        raise KnowledgePackError(f"{path}: a pack needs an 'errors' object")
+
+    types = {}
+    literals = {}
+    for error_type, entry in data['errors'].items():
+        where = f"{path}: {error_type}"
+        if not isinstance(entry, dict) or not isinstance(entry.get('summary'), str):
+            raise KnowledgePackError(f"{where}: each error needs a 'summary'")
+        for field in LIST_FIELDS:
+            values = entry.get(field, [])
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise KnowledgePackError(f"{where}: '{field}' must be a list of strings")
+        severity = entry.get('severity', 'unknown')
+        if severity not in SEVERITIES:
+            raise KnowledgePackError(f"{where}: severity must be one of {', '.join(SEVERITIES)}")
+        learn_more = entry.get('learn_more')
+        if learn_more is not None and not isinstance(learn_more, str):
+            raise KnowledgePackError(f"{where}: 'learn_more' must be a string or null")
+
+        for pattern in entry.get('patterns', []) + entry.get('natural_patterns', []):
+            problem = combine_error(pattern)
+            if problem is not None:
+                raise KnowledgePackError(f"{where}: bad pattern {pattern!r}: {problem}")
+            literals[pattern] = required_literal(pattern)
+
+        types[error_type] = {
+            'patterns': entry.get('patterns', []),
+            'natural_patterns': entry.get('natural_patterns', []),
+            'severity': severity,
+            'knowledge': {
+                'summary': entry['summary'],
+                'common_causes': entry.get('common_causes', []),
+                'solutions': entry.get('solutions', []),
+                'prevention_tips': entry.get('prevention_tips', []),
+                'learn_more': learn_more
+            }
+        }
+
+    return {'format': PACK_FORMAT, 'name': data.get('name', os.path.basename(path)),
+            'types': types, 'literals': literals}
+
+
+def _cache_path(path: str, cache_dir: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.marshal")
+
+
+def load_pack(path: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> Dict[str, Any]:
+    """Load a pack, reusing its marshal cache while the source file is unchanged"""
+    stat = os.stat(path)
+    stamp = (PACK_FORMAT, stat.st_mtime_ns, stat.st_size)
+    cache_path = _cache_path(path, cache_dir) if cache_dir else None
+
+    if cache_path:
+        try:
+            with open(cache_path, 'rb') as handle:
+                cached_stamp, compiled = marshal.loads(handle.read())
+            if tuple(cached_stamp) == stamp:
+                return compiled
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    compiled = compile_pack(path)
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as handle:
+                marshal.dump((stamp, compiled), handle)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+    return compiled
+
+
+class PackRegistry:
+    """A set of knowledge packs applied on top of the built-in tables"""
+
+    def __init__(self, paths: List[str], cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.paths = list(paths)
+        self.cache_dir = cache_dir
+        self.stamps: Dict[str, tuple] = {}
+        self.packs: List[Dict[str, Any]] = []
+
+    def _stamp(self, path: str) -> tuple:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return ()
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """Read every pack, failing without side effects if any pack is invalid"""
+        stamps = {path: self._stamp(path) for path in self.paths}
+        try:
+            packs = [load_pack(path, self.cache_dir) for path in self.paths]
+        finally:
+            # A broken pack is not retried until one of the files changes again
+            self.stamps = stamps
+        self.packs = packs
+
+    def changed(self) -> bool:
+        return any(self._stamp(path) != stamp for path, stamp in self.stamps.items())
+
+    def build(self):
+        """Return a fresh (parser, generator, knowledge base) with every pack merged in"""
+        parser = ErrorParser()
+        knowledge = KnowledgeBase()
+        generator = ExplanationGenerator(knowledge, parser)
+        for pack in self.packs:
+            parser.literal_cache.update(pack['literals'])
+            for error_type, entry in pack['types'].items():
+                if entry['patterns']:
+                    parser.patterns.setdefault(error_type, []).extend(entry['patterns'])
+                if entry['natural_patterns']:
+                    parser.natural_patterns.setdefault(error_type, []).extend(entry['natural_patterns'])
+                knowledge.error_knowledge[error_type] = entry['knowledge']
+                generator.severity_map[error_type] = entry['severity']
+        return parser, generator, knowledge
+
+    def apply(self, cognito):
+        """Swap pack-aware components into a Cognito, keeping its parser front ends
+
+        Each front end wraps the parser below it and rebuilds itself around
+        a new one with with_parser(), innermost first.
+        """
+        parser, generator, knowledge = self.build()
+        if cognito.parser.max_line_length is not None:
+            parser.harden(cognito.parser.max_line_length)
+        front_ends = []
+        front = cognito.parser
+        while hasattr(front, 'parser'):
+            front_ends.append(front)
+            front = front.parser
+        for front in reversed(front_ends):
+            parser = front.with_parser(parser, generator)
+        cognito.parser = parser
+        generator.package_index_path = cognito.generator.package_index_path
+        cognito.generator = generator
+        cognito.knowledge = knowledge
+
+    def reload_if_changed(self, cognito) -> bool:
+        """Reload and re-apply packs whose files changed; keep the old tables on error"""
+        if not self.changed():
+            return False
+        self.load()
+        self.apply(cognito)
+        return True
@@ -0,0 +1,172 @@
+import json
+import os
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+# At most this many bytes are read per poll, so a long backlog arrives in pieces
+READ_CHUNK_SIZE = 1 << 20
+DEFAULT_POLL_INTERVAL = 0.5
+CHECKPOINT_INTERVAL = 1.0
+
+
+class FollowedLine(NamedTuple):
+    """A complete line and the (epoch, byte offset) positions where it starts and ends
+
+    The epoch counts rotations and truncations, so positions in an earlier
+    file can be told apart from ones in the current file.
+    """
+    text: str
+    start: Tuple[int, int]
+    end: Tuple[int, int]
+
+
+class LogFollower:
+    """Tails a growing log file across rotation and truncation
+
+    Only complete lines are returned; a trailing partial line waits for its
+    newline. The position of the last line the caller has processed can be
+    saved to a checkpoint file so a restart resumes there instead of
+    rereading the file. Without a usable checkpoint, following starts at the
+    current end of the file.
+    """
+
+    def __init__(self, path: str, checkpoint_path: Optional[str] = None):
+        self.path = path
+        self.checkpoint_path = checkpoint_path
+        self.handle = None
+        self.identity = None
+        self.offset = 0
+        self.partial = b''
+        self.rotations = 0
+        self.truncations = 0
+        self.backlog = False
+        self.last_checkpoint = 0.0
+        self.saved_state = None
+
+    def _identity(self, stat: os.stat_result) -> tuple:
+        return (stat.st_dev, stat.st_ino)
+
+    def _load_checkpoint(self) -> Optional[dict]:
+        if not self.checkpoint_path:
+            return None
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get('path') != os.path.abspath(self.path):
+            return None
+        return state
+
+    def open(self):
+        """Open the file at the checkpointed offset, or at its end"""
+        self.handle = open(self.path, 'rb')
+        stat = os.fstat(self.handle.fileno())
+        self.identity = self._identity(stat)
+        self.partial = b''
+
+        state = self._load_checkpoint()
+        if state is None:
+            self.offset = stat.st_size
+        elif tuple(state.get('identity', ())) != self.identity:
+            # The file was rotated while we were stopped; the new one is unread
+            self.offset = 0
+        elif state.get('offset', 0) > stat.st_size:
+            self.offset = 0
+        else:
+            self.offset = state['offset']
+        self.handle.seek(self.offset)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    @property
+    def epoch(self) -> int:
+        return self.rotations + self.truncations
+
+    @property
+    def position(self) -> Tuple[int, int]:
+        """Where the next complete line will start"""
+        return (self.epoch, self.offset)
+
+    def _lines(self, data: bytes) -> List[FollowedLine]:
+        """Split complete lines starting at the current offset, advancing it past them"""
+        lines = []
+        for raw in data.split(b'\n'):
+            start = self.position
+            self.offset += len(raw) + 1
+            lines.append(FollowedLine(raw.decode('utf-8', errors='replace'), start, self.position))
+        return lines
+
+    def _read_available(self) -> List[FollowedLine]:
+        """Read up to READ_CHUNK_SIZE bytes, noting in backlog whether more are waiting"""
+        chunk = self.handle.read(READ_CHUNK_SIZE)
+        self.backlog = len(chunk) == READ_CHUNK_SIZE
+        complete, newline, self.partial = (self.partial + chunk).rpartition(b'\n')
+        return self._lines(complete) if newline else []
+
+    def _reopen(self):
+        self.close()
+        self.handle = open(self.path, 'rb')
+        self.identity = self._identity(os.fstat(self.handle.fileno()))
+        self.offset = 0
+        self.partial = b''
+
+    def poll(self) -> List[FollowedLine]:
+        """Return complete lines appended since the last poll, at most about READ_CHUNK_SIZE bytes of them"""
+        if self.handle is None:
+            self.open()
+        lines = self._read_available()
+        if self.backlog:
+            return lines
+
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not yet recreated; keep the old handle for now
+            return lines
+
+        if self._identity(stat) != self.identity:
+            # Drain whatever was appended to the old file before it was renamed
+            lines.extend(self._read_available())
+            if self.backlog:
+                return lines
+            if self.partial:
+                partial, self.partial = self.partial, b''
+                lines.extend(self._lines(partial))
+            self._reopen()
+            self.rotations += 1
+            lines.extend(self._read_available())
+        elif stat.st_size < self.offset + len(self.partial):
+            self.handle.seek(0)
+            self.offset = 0
+            self.partial = b''
+            self.truncations += 1
+            lines.extend(self._read_available())
+        return lines
+
+    def save_checkpoint(self, force: bool = False, position: Optional[Tuple[int, int]] = None):
+        """Record where to resume, at most once per CHECKPOINT_INTERVAL
+
+        position is where the first line not yet processed starts, and
+        defaults to everything read so far. A position in a file that has
+        since been rotated or truncated resumes the current file from its start.
+        """
+        if not self.checkpoint_path or self.handle is None:
+            return
+        now = time.monotonic()
+        if not force and now - self.last_checkpoint < CHECKPOINT_INTERVAL:
+            return
+        self.last_checkpoint = now
+        epoch, offset = self.position if position is None else position
+        state = {'path': os.path.abspath(self.path), 'identity': list(self.identity),
+                 'offset': offset if epoch == self.epoch else 0}
+        if state == self.saved_state:
+            return
+        temp_path = f"{self.checkpoint_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(state, handle)
+        os.replace(temp_path, self.checkpoint_path)
+        self.saved_state = state
@@ -0,0 +1,145 @@
+import io
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+READ_BUFFER_SIZE = 1 << 20
+DECOMPRESS_QUEUE_DEPTH = 8
+# Lines explained together when latency does not matter, e.g. for files
+EXPLAIN_BATCH_SIZE = 256
+
+# Leading bytes of each supported compression format, and the module that reads it
+COMPRESSION_MAGIC = ((b'\x1f\x8b', 'gzip'), (b'BZh', 'bz2'), (b'\xfd7zXZ\x00', 'lzma'))
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """Name of the module that decompresses data starting with head, or None for plain text"""
+    for magic, module in COMPRESSION_MAGIC:
+        if head.startswith(magic):
+            return module
+    return None
+
+
+def file_compression(path: str) -> Optional[str]:
+    with open(path, 'rb') as handle:
+        return detect_compression(handle.read(6))
+
+
+def read_lines(source: str, keep_indent: bool = False) -> Iterator[str]:
+    """Yield non-empty lines from a log file, or from stdin when source is '-'
+    
+    gzip, bzip2 and xz input is recognised by its magic bytes and decompressed
+    on a background thread while the caller works on earlier lines.
+    """
+    if source == '-':
+        yield from _handle_lines(sys.stdin.buffer, keep_indent, sys.stdin)
+        return
+    with open(source, 'rb', buffering=READ_BUFFER_SIZE) as handle:
+        yield from _handle_lines(handle, keep_indent)
+
+
+def _handle_lines(handle, keep_indent: bool = False, text=None) -> Iterator[str]:
+    """Lines of an open binary stream, sniffing compression with peek() so pipes lose no bytes"""
+    compression = detect_compression(handle.peek(6)[:6]) if hasattr(handle, 'peek') else None
+    if compression is not None:
+        yield from _clean_lines(_decompressed_lines(handle, compression), keep_indent)
+        return
+    if text is None:
+        text = io.TextIOWrapper(handle, encoding='utf-8', errors='replace')
+    yield from _clean_lines(text, keep_indent)
+
+
+def _decompressed_chunks(handle, compression: str) -> Iterator[bytes]:
+    """Decompress a binary stream on a reader thread, yielding blocks through a bounded queue"""
+    import importlib
+    import queue
+    import threading
+    
+    stream = importlib.import_module(compression).open(handle, 'rb')
+    blocks = queue.Queue(maxsize=DECOMPRESS_QUEUE_DEPTH)
+    stop = threading.Event()
+    
+    def reader():
+        try:
+            while not stop.is_set():
+                block = stream.read(READ_BUFFER_SIZE)
+                while not stop.is_set():
+                    try:
+                        blocks.put(block, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if not block:
+                    return
+        except Exception as e:
+            blocks.put(e)
+    
+    thread = threading.Thread(target=reader, name='cognito-decompress', daemon=True)
+    thread.start()
+    try:
+        while True:
+            block = blocks.get()
+            if isinstance(block, Exception):
+                raise block
+            if not block:
+                return
+            yield block
+    finally:
+        # Also reached when the consumer stops early
+        stop.set()
+        thread.join()
+        stream.close()
+
+
+def _decompressed_lines(handle, compression: str) -> Iterator[str]:
+    """Split decompressed blocks into text lines without holding more than one block"""
+    partial = b''
+    for block in _decompressed_chunks(handle, compression):
+        complete, _, partial = (partial + block).rpartition(b'\n')
+        if complete:
+            # Splitting at newlines first never cuts a UTF-8 character in half
+            yield from complete.decode('utf-8', errors='replace').split('\n')
+    if partial:
+        yield partial.decode('utf-8', errors='replace')
+
+
+def _clean_lines(handle: Iterable[str], keep_indent: bool = False) -> Iterator[str]:
+    """Strip line endings and skip blank lines, optionally keeping leading indentation"""
+    for line in handle:
+        line = line.rstrip() if keep_indent else line.strip()
+        if line:
+            yield line
+
+
+def parse_lines(parser, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse each line lazily with an ErrorParser"""
+    for line in lines:
+        yield parser.parse_error(line)
+
+
+def explain_errors(generator, parsed_errors: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Explain each parsed error lazily with an ExplanationGenerator"""
+    for parsed_error in parsed_errors:
+        yield generator.generate_explanation(parsed_error)
+
+
+def analyze_lines(parser, generator, lines: Iterable[str], batch_size: int = 1) -> Iterator[Dict[str, Any]]:
+    """Stream lines through parsing and explanation, one at a time or batch_size at a time"""
+    if batch_size <= 1:
+        return explain_errors(generator, parse_lines(parser, lines))
+    return _analyze_batches(parser, generator, lines, batch_size)
+
+
+def _analyze_batches(parser, generator, lines: Iterable[str], batch_size: int) -> Iterator[Dict[str, Any]]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield from analyze_batch(parser, generator, batch)
+            batch = []
+    if batch:
+        yield from analyze_batch(parser, generator, batch)
+
+
+def analyze_batch(parser, generator, lines: List[str]) -> List[Dict[str, Any]]:
+    """Parse and explain a list of lines, ranking related types of its unknown lines together"""
+    return generator.generate_explanations([parser.parse_error(line) for line in lines])
@@ -0,0 +1,133 @@
+import mmap
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+INDEX_FORMAT = b"COGNITO-PACKAGES 1\n"
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'cognito', 'packages.idx')
+BINARY_DIRS = frozenset(('bin', 'sbin', 'usr/bin', 'usr/sbin', 'usr/games', 'usr/local/bin', 'usr/local/sbin'))
+# Marks packages from dpkg file lists, which are already installed
+INSTALLED = '*'
+
+
+def _binary_name(path: str) -> Optional[str]:
+    """The command name for a path in a binary directory, or None"""
+    directory, _, name = path.strip().strip('/').rpartition('/')
+    if directory in BINARY_DIRS and name:
+        return name
+    return None
+
+
+def _open_text(path: str):
+    if path.endswith('.gz'):
+        import gzip
+
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def read_contents(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (command, package) pairs from an apt Contents file"""
+    with _open_text(path) as handle:
+        for line in handle:
+            fields = line.rsplit(None, 1)
+            if len(fields) != 2:
+                continue
+            command = _binary_name(fields[0])
+            if command is None:
+                continue
+            for qualified in fields[1].split(','):
+                yield command, qualified.rpartition('/')[2]
+
+
+def read_dpkg_list(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (command, package) pairs from a dpkg info/<package>.list file"""
+    package = os.path.basename(path)[:-len('.list')].partition(':')[0]
+    with _open_text(path) as handle:
+        for line in handle:
+            command = _binary_name(line)
+            if command is not None:
+                yield command, INSTALLED + package
+
+
+def find_sources(root: str = '/') -> List[str]:
+    """apt Contents files and dpkg file lists under root, which a fixture directory can stand in for"""
+    import glob
+
+    contents = []
+    for path in glob.glob(os.path.join(root, 'var/lib/apt/lists/*Contents-*')):
+        # Plain or gzipped only; lz4-compressed lists are skipped
+        suffix = path.rpartition('Contents-')[2]
+        if suffix.endswith('.gz') or '.' not in suffix:
+            contents.append(path)
+    return sorted(contents) + sorted(glob.glob(os.path.join(root, 'var/lib/dpkg/info/*.list')))
+
+
+def build_index(sources: Iterable[str], path: str = DEFAULT_INDEX_PATH) -> int:
+    """Write a sorted command -> packages index, returning the number of commands"""
+    providers: Dict[str, Set[str]] = {}
+    for source in sources:
+        reader = read_dpkg_list if source.endswith('.list') else read_contents
+        for command, package in reader(source):
+            providers.setdefault(command, set()).add(package)
+
+    lines = []
+    for command in sorted(providers):
+        packages = providers[command]
+        # An installed package also appears in Contents; keep only the installed mark
+        installed = {package[1:] for package in packages if package.startswith(INSTALLED)}
+        ordered = sorted(packages - installed, key=lambda package: (not package.startswith(INSTALLED), package))
+        lines.append(f"{command}\t{','.join(ordered)}\n")
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        handle.write(INDEX_FORMAT)
+        handle.write(''.join(lines).encode('utf-8'))
+    os.replace(temp_path, path)
+    return len(lines)
+
+
+class PackageIndex:
+    """Memory-mapped, sorted command -> packages table searched by bisection"""
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = path
+        with open(path, 'rb') as handle:
+            if handle.read(len(INDEX_FORMAT)) != INDEX_FORMAT:
+                raise ValueError(f"{path}: not a package index")
+            size = os.fstat(handle.fileno()).st_size
+            self.data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) if size > len(INDEX_FORMAT) else b''
+
+    def lookup(self, command: str) -> List[str]:
+        """Packages providing command, installed ones (prefixed with '*') first"""
+        data = self.data
+        key = command.encode('utf-8')
+        low = len(INDEX_FORMAT)
+        high = len(data)
+        while low < high:
+            middle = (low + high) // 2
+            start = data.rfind(b'\n', low, middle) + 1 or low
+            end = data.find(b'\n', start)
+            tab = data.find(b'\t', start, end)
+            found = data[start:tab]
+            if found < key:
+                low = end + 1
+            elif found > key:
+                high = start
+            else:
+                return data[tab + 1:end].decode('utf-8').split(',')
+        return []
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def open_index(path: str = DEFAULT_INDEX_PATH) -> Optional[PackageIndex]:
+    """The index at path, or None if it has not been built"""
+    try:
+        return PackageIndex(path)
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,211 @@
+import mmap
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from error_parser import ErrorParser
+from explanation_generator import ExplanationGenerator
+from log_stream import analyze_batch, analyze_lines, file_compression, read_lines, EXPLAIN_BATCH_SIZE
+
+MAX_CHUNK_SIZE = 16 << 20
+MIN_CHUNK_SIZE = 64 << 10
+CHUNKS_PER_JOB = 4
+BATCH_LINES = 5000
+
+_parser = None
+_generator = None
+
+
+def _init_worker(max_line_length: int = None, packs: Sequence[str] = ()):
+    """Build one parser and generator per worker process, with the parent's knowledge packs"""
+    global _parser, _generator
+    if packs:
+        from knowledge_pack import PackRegistry
+
+        registry = PackRegistry(packs)
+        registry.load()
+        _parser, _generator, _ = registry.build()
+    else:
+        _parser = ErrorParser()
+        _generator = ExplanationGenerator(parser=_parser)
+    if max_line_length:
+        _parser.harden(max_line_length)
+
+
+def _splittable(path: str) -> bool:
+    """Whether a file can be split by byte offset: a regular, uncompressed file
+    
+    Pipes and FIFOs are never opened twice here, as a second open would miss
+    the bytes read to sniff compression.
+    """
+    return os.path.isfile(path) and file_compression(path) is None
+
+
+def chunk_ranges(path: str, jobs: int) -> List[Tuple[int, int]]:
+    """Split a file into newline-aligned (start, end) byte ranges"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, -(-size // (jobs * CHUNKS_PER_JOB))))
+
+    ranges = []
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        start = 0
+        while start < size:
+            end = start + chunk_size
+            if end >= size:
+                end = size
+            else:
+                newline = mapped.find(b'\n', end - 1)
+                end = size if newline == -1 else newline + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def iter_chunk_lines(mapped: mmap.mmap, start: int, end: int) -> Iterator[str]:
+    """Yield the non-empty lines of a mapped byte range, copying one line at a time"""
+    pos = start
+    while pos < end:
+        newline = mapped.find(b'\n', pos, end)
+        if newline == -1:
+            newline = end
+        line = mapped[pos:newline].decode('utf-8', 'replace').strip()
+        if line:
+            yield line
+        pos = newline + 1
+
+
+def _analyze_chunk(path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    """Explain every line in one chunk"""
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return list(analyze_lines(_parser, _generator, iter_chunk_lines(mapped, start, end), EXPLAIN_BATCH_SIZE))
+
+
+def _aggregate_lines(lines: Iterable[str]) -> Dict[str, Any]:
+    """Count error types and severities"""
+    error_types = Counter()
+    severities = Counter()
+    for line in lines:
+        error_type = _parser.classify_error(line)
+        error_types[error_type] += 1
+        severities[_generator.assess_severity(error_type)] += 1
+    return {'lines': sum(error_types.values()), 'error_types': error_types, 'severities': severities}
+
+
+def _aggregate_chunk(path: str, start: int, end: int) -> Dict[str, Any]:
+    """Count error types and severities in one chunk"""
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        return _aggregate_lines(iter_chunk_lines(mapped, start, end))
+
+
+def _analyze_batch(lines: List[str]) -> List[Dict[str, Any]]:
+    return analyze_batch(_parser, _generator, lines)
+
+
+def _report_batch(lines: List[str], options: Dict[str, Any]):
+    from report import StreamReport
+    
+    return StreamReport(_parser, _generator, **options).add_lines(lines)
+
+
+def _batches(lines: Iterable[str], size: int = BATCH_LINES) -> Iterator[List[str]]:
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _map_batches(func, lines: Iterable[str], jobs: int, initargs: tuple = (), *args) -> Iterator[Any]:
+    """Run func over batches of a line stream on several cores, yielding results in input order
+    
+    Used for input that cannot be split by byte offset, such as compressed
+    files and pipes, where lines are read here and shipped to the workers.
+    """
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+        pending = deque()
+        for batch in _batches(lines):
+            pending.append(pool.submit(func, batch, *args))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _map_chunks(func, path: str, jobs: int, initargs: tuple = (), *args) -> Iterator[Any]:
+    """Run func over newline-aligned chunks of a file on several cores, yielding results in file order"""
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs) as pool:
+        # Keep a bounded window of chunks in flight so memory does not grow with file size
+        pending = deque()
+        for start, end in chunk_ranges(path, jobs):
+            pending.append(pool.submit(func, path, start, end, *args))
+            if len(pending) >= jobs * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _report_chunk(path: str, start: int, end: int, options: Dict[str, Any]):
+    """Build a bounded report over one chunk"""
+    from report import StreamReport
+    
+    report = StreamReport(_parser, _generator, **options)
+    with open(path, 'rb') as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        report.add_lines(iter_chunk_lines(mapped, start, end))
+    return report
+
+
+def analyze_file_parallel(path: str, jobs: int, max_line_length: int = None,
+                          packs: Sequence[str] = ()) -> Iterator[Dict[str, Any]]:
+    """Explain every line of a file on several cores, yielding results in input order"""
+    initargs = (max_line_length, tuple(packs))
+    if not _splittable(path):
+        for explanations in _map_batches(_analyze_batch, read_lines(path), jobs, initargs):
+            yield from explanations
+        return
+    for explanations in _map_chunks(_analyze_chunk, path, jobs, initargs):
+        yield from explanations
+
+
+def aggregate_file_parallel(path: str, jobs: int, max_line_length: int = None,
+                            packs: Sequence[str] = ()) -> Dict[str, Any]:
+    """Count error types and severities of a file on several cores, in no particular order"""
+    totals = {'lines': 0, 'error_types': Counter(), 'severities': Counter()}
+    initargs = (max_line_length, tuple(packs))
+    if not _splittable(path):
+        partials = _map_batches(_aggregate_lines, read_lines(path), jobs, initargs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=initargs)
+        with pool:
+            futures = [pool.submit(_aggregate_chunk, path, start, end) for start, end in chunk_ranges(path, jobs)]
+            partials = [future.result() for future in as_completed(futures)]
+    for partial in partials:
+        totals['lines'] += partial['lines']
+        totals['error_types'].update(partial['error_types'])
+        totals['severities'].update(partial['severities'])
+    return totals
+
+
+def report_file_parallel(path: str, jobs: int, max_line_length: int = None, packs: Sequence[str] = (),
+                         **options):
+    """Build a StreamReport on several cores by merging per-chunk reports"""
+    from report import StreamReport
+    
+    report = None
+    initargs = (max_line_length, tuple(packs))
+    if not _splittable(path):
+        partials = _map_batches(_report_batch, read_lines(path), jobs, initargs, options)
+    else:
+        partials = _map_chunks(_report_chunk, path, jobs, initargs, options)
+    # Merge in file order, as each partial arrives, so window eviction keeps the latest windows
+    for partial in partials:
+        if report is None:
+            report = partial
+        else:
+            report.merge(partial)
+    return report or StreamReport(None, None, **options)
@@ -0,0 +1,486 @@
+import re
+import time
+import unicodedata
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+_QUANTIFIERS = '*?{'
+GRAM = 4
+GRAM_INDEX_THRESHOLD = 256
+
+
+class PatternMatch(NamedTuple):
+    error_type: str
+    natural_hits: Tuple[Tuple[str, str], ...]
+    technical_hits: Tuple[Tuple[str, str], ...]
+
+    def counts(self, error_type: str) -> Tuple[int, int]:
+        """Return (technical, natural) match counts for an error type"""
+        technical = sum(1 for hit_type, _ in self.technical_hits if hit_type == error_type)
+        natural = sum(1 for hit_type, _ in self.natural_hits if hit_type == error_type)
+        return technical, natural
+
+
+NO_MATCH = PatternMatch('unknown', (), ())
+
+
+def _skip_class(pattern: str, i: int) -> int:
+    """Return the index just past the character class opened at i"""
+    i += 1
+    if pattern[i:i + 1] == '^':
+        i += 1
+    if pattern[i:i + 1] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        i += 2 if pattern[i] == '\\' else 1
+    return i + 1
+
+
+def _skip_group(pattern: str, i: int) -> int:
+    """Return the index just past the group opened at i"""
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(pattern, i)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+_CHAR_ESCAPE = re.compile(r"\\(?:x([0-9a-fA-F]{2})|u([0-9a-fA-F]{4})|U([0-9a-fA-F]{8})|N\{([^}]*)\}"
+                          r"|(0[0-7]{0,2}|[0-7]{3}))")
+
+
+def _escaped_char(pattern: str, i: int) -> Tuple[int, Optional[str]]:
+    """Decode a character escape such as \\x41, \\u00e9, \\N{...} or \\101 at i
+
+    Returns the index just past it and the character, or (i, None) if there
+    is no such escape at i.
+    """
+    match = _CHAR_ESCAPE.match(pattern, i)
+    if match is None:
+        return i, None
+    hex_digits, name, octal = match.group(1) or match.group(2) or match.group(3), match.group(4), match.group(5)
+    try:
+        if hex_digits:
+            char = chr(int(hex_digits, 16))
+        elif name is not None:
+            char = unicodedata.lookup(name)
+        else:
+            char = chr(int(octal, 8))
+    except (KeyError, ValueError):
+        return i, None
+    return match.end(), char
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """Return the longest lowercase literal that every match of pattern contains"""
+    best = ''
+    run: List[str] = []
+
+    def flush():
+        nonlocal best
+        if len(run) > len(best):
+            best = ''.join(run)
+        run.clear()
+
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '|':
+            return None
+        if c == '\\':
+            end, char = _escaped_char(pattern, i)
+            if char is not None:
+                # Case-insensitive matches of non-ASCII characters can differ from str.lower()
+                if char.isascii():
+                    run.append(char)
+                else:
+                    flush()
+                i = end
+                continue
+            nxt = pattern[i + 1:i + 2]
+            i += 2
+            if nxt.isalnum():
+                flush()
+                if nxt.isdigit() and pattern[i:i + 1].isdigit():
+                    # Backreferences run to two digits
+                    i += 1
+                continue
+            run.append(nxt)
+            continue
+        if c == '(':
+            flush()
+            i = _skip_group(pattern, i)
+            continue
+        if c == '[':
+            flush()
+            i = _skip_class(pattern, i)
+            continue
+        if c in _QUANTIFIERS:
+            if run:
+                run.pop()
+            flush()
+            if c == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+                continue
+        elif c in '+.^$':
+            flush()
+        else:
+            run.append(c)
+        i += 1
+    flush()
+    return best.lower() or None
+
+
+_GAPS = ('.*?', '.+?', '.*', '.+')
+
+
+def gap_sequence(pattern: str) -> Optional[Tuple[Tuple[str, int], ...]]:
+    """Split a pattern of literals joined by .* or .+ into (literal, minimum gap) pairs
+
+    Returns None for any other pattern. Such a pattern matches a line exactly
+    when its literals can be found in order with the given gaps, which takes
+    one left-to-right pass instead of regex backtracking.
+    """
+    segments = []
+    run: List[str] = []
+    gap = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            nxt = pattern[i + 1:i + 2]
+            if not nxt or nxt.isalnum():
+                return None
+            run.append(nxt)
+            i += 2
+            continue
+        if c == '.':
+            token = next((g for g in _GAPS if pattern.startswith(g, i)), None)
+            if token is None or not run:
+                return None
+            segments.append((''.join(run), gap))
+            run = []
+            gap = 1 if token[1] == '+' else 0
+            i += len(token)
+            continue
+        if c in '[](){}|?*+^$':
+            return None
+        run.append(c)
+        i += 1
+    if not run:
+        return None
+    segments.append((''.join(run), gap))
+    return tuple(segments) if len(segments) > 1 else None
+
+
+def is_linear(pattern: str) -> bool:
+    """Whether a regex search for pattern is linear in the input length
+
+    True for patterns without unbounded repetition, and for gap sequences,
+    which a linear PatternEngine checks with str.find instead of a regex.
+    """
+    if gap_sequence(pattern) is not None:
+        return True
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(pattern, i)
+            continue
+        if c in '*+':
+            return False
+        if c == '{' and re.match(r"\{\d*,\}", pattern[i:]):
+            return False
+        i += 1
+    return True
+
+
+def _embed(index: int, pattern: str) -> str:
+    """One alternative of the combined regex: a lookahead that records where pattern matched"""
+    return f"(?=(?s:.*?)(?P<p{index}>{pattern})|)"
+
+
+def _has_backreference(pattern: str) -> bool:
+    """Whether pattern refers back to one of its groups by number or name"""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            nxt = pattern[i + 1:i + 2]
+            if nxt.isdigit() and nxt != '0':
+                return True
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(pattern, i)
+            continue
+        if pattern.startswith('(?P=', i):
+            return True
+        i += 1
+    return False
+
+
+def combine_error(pattern: str, flags: int = re.IGNORECASE) -> Optional[str]:
+    """Why pattern cannot be one alternative of the engine's combined regex, or None if it can
+
+    Group numbers and names are shared by every pattern in the combined
+    regex, and inline flags only apply at its very start.
+    """
+    try:
+        compiled = re.compile(pattern, flags)
+    except re.error as e:
+        return str(e)
+    if compiled.groupindex:
+        return "named groups cannot be combined with other patterns"
+    if _has_backreference(pattern):
+        return "backreferences cannot be combined with other patterns"
+    try:
+        re.compile(_embed(0, pattern), flags)
+    except re.error:
+        return "inline flags such as (?i) cannot be combined with other patterns; scope them as (?i:...)"
+    return None
+
+
+def _contains_sequence(line: str, segments: Tuple[Tuple[str, int], ...]) -> bool:
+    """Whether the literals occur in order with at least their minimum gaps"""
+    position = line.find(segments[0][0])
+    if position < 0:
+        return False
+    position += len(segments[0][0])
+    for literal, gap in segments[1:]:
+        position = line.find(literal, position + gap)
+        if position < 0:
+            return False
+        position += len(literal)
+    return True
+
+
+class PatternEngine:
+    """Single-pass matcher compiled from the natural and technical pattern tables
+
+    Candidate sets that keep recurring get one combined regex; small or
+    one-off sets are matched with each pattern's own precompiled regex, so
+    large tables do not pay a re.compile for every new message.
+    """
+
+    MAX_COMPILED = 512
+    # A candidate set is combined once seen this often, if it has more than MAX_SINGLES patterns
+    COMBINE_AFTER = 2
+    MAX_SINGLES = 2
+
+    def __init__(self, natural_patterns: Dict[str, List[str]], patterns: Dict[str, List[str]],
+                 flags: int = re.IGNORECASE, literal_cache: Optional[Dict[str, Optional[str]]] = None,
+                 linear: bool = False):
+        self.flags = flags
+        self.linear = linear
+        self.entries: List[Tuple[str, str, str]] = []
+        for table, source in (('natural', natural_patterns), ('technical', patterns)):
+            for error_type, type_patterns in source.items():
+                for pattern in type_patterns:
+                    self.entries.append((table, error_type, pattern))
+
+        # Each pattern is keyed by a literal it cannot match without; patterns
+        # with no usable literal are always candidates.
+        literal_cache = literal_cache or {}
+        self.literals = tuple(literal_cache[pattern] if pattern in literal_cache else required_literal(pattern)
+                              for _, _, pattern in self.entries)
+        by_literal: Dict[str, List[int]] = {}
+        for index, literal in enumerate(self.literals):
+            if literal is not None:
+                by_literal.setdefault(literal, []).append(index)
+        self._prefilter = tuple((literal, tuple(indices)) for literal, indices in by_literal.items())
+        self._build_gram_index()
+        self._always = tuple(index for index, literal in enumerate(self.literals) if literal is None)
+        self._all = tuple(range(len(self.entries)))
+        self._group_names = tuple(f'p{index}' for index in self._all)
+        self._compiled: Dict[Tuple[int, ...], re.Pattern] = {}
+        self._seen: Counter = Counter()
+        self._singles: List[Optional[re.Pattern]] = [None] * len(self.entries)
+
+        # In linear mode, literal-and-gap patterns are checked with str.find
+        self._sequences: Dict[int, Tuple[Tuple[str, int], ...]] = {}
+        if linear:
+            fold = bool(flags & re.IGNORECASE)
+            for index, (_, _, pattern) in enumerate(self.entries):
+                segments = gap_sequence(pattern)
+                if segments is not None:
+                    self._sequences[index] = tuple((literal.lower() if fold else literal, gap)
+                                                   for literal, gap in segments)
+
+    def _build_gram_index(self):
+        """Bucket literals by one of their 4-grams once tables grow past a few hundred literals
+
+        A message can only contain a literal if it contains every 4-gram of it, so
+        checking the buckets of the message's own 4-grams finds the same literals
+        as scanning them all.
+        """
+        self._gram_index: Optional[Dict[str, List[Tuple[str, Tuple[int, ...]]]]] = None
+        self._short_literals: List[Tuple[str, Tuple[int, ...]]] = []
+        if len(self._prefilter) < GRAM_INDEX_THRESHOLD:
+            return
+        # Any gram of a literal is a valid key, so only every GRAM-th one is considered
+        literal_grams = [(literal, indices, {literal[i:i + GRAM] for i in range(0, len(literal) - GRAM + 1, GRAM)})
+                         for literal, indices in self._prefilter]
+        frequency = Counter()
+        for _, _, grams in literal_grams:
+            frequency.update(grams)
+
+        # Index each literal under its rarest gram to keep buckets small
+        self._gram_index = {}
+        for literal, indices, grams in literal_grams:
+            if not grams:
+                self._short_literals.append((literal, indices))
+                continue
+            gram = min(grams, key=frequency.__getitem__)
+            self._gram_index.setdefault(gram, []).append((literal, indices))
+        self._gram_keys = frozenset(self._gram_index)
+
+    def _literal_checks(self, error_lower: str):
+        """Return the (literal, indices) pairs worth testing against a message"""
+        if self._gram_index is None or len(error_lower) > len(self._prefilter) * GRAM:
+            return self._prefilter
+        grams = {error_lower[i:i + GRAM] for i in range(len(error_lower) - GRAM + 1)}
+        checks = list(self._short_literals)
+        for gram in self._gram_keys.intersection(grams):
+            checks.extend(self._gram_index[gram])
+        return checks
+
+    def _combined(self, candidates: Tuple[int, ...]) -> re.Pattern:
+        """Return one regex reporting every candidate that matches as a named group"""
+        compiled = self._compiled.get(candidates)
+        if compiled is None:
+            if len(self._compiled) >= self.MAX_COMPILED:
+                self._compiled.clear()
+            source = ''.join(_embed(index, self.entries[index][2]) for index in candidates)
+            compiled = self._compiled[candidates] = re.compile(source, self.flags)
+        return compiled
+
+    def _single(self, index: int) -> re.Pattern:
+        compiled = self._singles[index]
+        if compiled is None:
+            compiled = self._singles[index] = re.compile(self.entries[index][2], self.flags)
+        return compiled
+
+    def _searcher(self, error_message: str, candidates: Tuple[int, ...]) -> Callable[[int], bool]:
+        """Return a test of whether each candidate matches the message"""
+        combined = self._compiled.get(candidates)
+        if combined is None and len(candidates) > self.MAX_SINGLES:
+            if len(self._seen) >= self.MAX_COMPILED * 4:
+                self._seen.clear()
+            self._seen[candidates] += 1
+            if self._seen[candidates] >= self.COMBINE_AFTER:
+                combined = self._combined(candidates)
+        # Natural patterns were always matched against the lowercased message
+        natural_message = error_message if error_message.isascii() else error_message.lower()
+        if combined is None:
+            return lambda index: self._single(index).search(
+                natural_message if self.entries[index][0] == 'natural' else error_message) is not None
+
+        matched = combined.match(error_message)
+        natural_matched = matched if natural_message is error_message else combined.match(natural_message)
+        group_names = self._group_names
+        return lambda index: (natural_matched if self.entries[index][0] == 'natural'
+                              else matched).start(group_names[index]) >= 0
+
+    def candidates(self, error_message: str) -> Tuple[int, ...]:
+        """Return indices of patterns whose required literal occurs in the message"""
+        if not error_message.isascii():
+            # str.lower() and re.IGNORECASE disagree on some non-ASCII characters,
+            # so the literal prefilter is only exact for ASCII input.
+            return self._all
+        error_lower = error_message.lower()
+        found = list(self._always)
+        for literal, indices in self._literal_checks(error_lower):
+            if literal in error_lower:
+                found.extend(indices)
+        found.sort()
+        return tuple(found)
+
+    def match(self, error_message: str) -> PatternMatch:
+        """Classify a message and collect every pattern that matched it"""
+        candidates = self.candidates(error_message)
+        if not candidates:
+            return NO_MATCH
+        if self._sequences and error_message.isascii():
+            return self._match_linear(error_message, candidates)
+
+        hit = self._searcher(error_message, candidates)
+        natural_hits = []
+        technical_hits = []
+        for index in candidates:
+            if hit(index):
+                table, error_type, pattern = self.entries[index]
+                (natural_hits if table == 'natural' else technical_hits).append((error_type, pattern))
+        return _build_match(natural_hits, technical_hits)
+
+    def _match_linear(self, error_message: str, candidates: Tuple[int, ...]) -> PatternMatch:
+        """Like match, but checks gap-sequence patterns without backtracking"""
+        text = error_message.lower() if self.flags & re.IGNORECASE else error_message
+        lines = text.split('\n') if '\n' in text else (text,)
+        remaining = tuple(index for index in candidates if index not in self._sequences)
+        matches = self._searcher(error_message, remaining) if remaining else None
+
+        natural_hits = []
+        technical_hits = []
+        for index in candidates:
+            table, error_type, pattern = self.entries[index]
+            segments = self._sequences.get(index)
+            if segments is not None:
+                hit = any(_contains_sequence(line, segments) for line in lines)
+            else:
+                hit = matches(index)
+            if hit:
+                (natural_hits if table == 'natural' else technical_hits).append((error_type, pattern))
+        return _build_match(natural_hits, technical_hits)
+
+    def match_each(self, error_message: str, observe: Callable[[int, bool, int], None]) -> PatternMatch:
+        """Match candidates one at a time, reporting (index, matched, nanoseconds) for each
+
+        Each pattern is checked the way match checks it, so in linear mode
+        gap sequences still use str.find rather than their regex.
+        """
+        error_lower = error_message.lower()
+        sequences = self._sequences if error_message.isascii() else {}
+        if sequences:
+            text = error_lower if self.flags & re.IGNORECASE else error_message
+            lines = text.split('\n') if '\n' in text else (text,)
+        clock = time.perf_counter_ns
+        natural_hits = []
+        technical_hits = []
+        for index in self.candidates(error_message):
+            table, error_type, pattern = self.entries[index]
+            segments = sequences.get(index)
+            start = clock()
+            if segments is not None:
+                matched = any(_contains_sequence(line, segments) for line in lines)
+            else:
+                matched = self._single(index).search(error_lower if table == 'natural' else error_message) is not None
+            observe(index, matched, clock() - start)
+            if matched:
+                (natural_hits if table == 'natural' else technical_hits).append((error_type, pattern))
+        return _build_match(natural_hits, technical_hits)
+
+def _build_match(natural_hits: list, technical_hits: list) -> PatternMatch:
+    """Pick the error type by table order: natural patterns win over technical ones"""
+    if natural_hits:
+        error_type = natural_hits[0][0]
+    elif technical_hits:
+        error_type = technical_hits[0][0]
+    else:
+        return NO_MATCH
+    return PatternMatch(error_type, tuple(natural_hits), tuple(technical_hits))
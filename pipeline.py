@@ -0,0 +1,243 @@
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+POLICIES = ('block', 'drop_oldest', 'sample')
+DEFAULT_QUEUE_SIZE = 1024
+DEFAULT_SAMPLE_RATE = 10
+# Worker processes take up to this many waiting lines per round trip
+PROCESS_BATCH_SIZE = 256
+# Under the sample policy, lines are sampled once the explain queue is this full
+SAMPLE_PRESSURE = 0.5
+
+_DONE = object()
+
+
+class BoundedQueue:
+    """Thread-safe FIFO of at most maxsize items that either blocks or evicts the oldest when full"""
+
+    def __init__(self, maxsize: int, drop_oldest: bool = False):
+        if maxsize < 1:
+            raise ValueError("queue size must be at least 1")
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.items = deque()
+        self.dropped = 0
+        lock = threading.Lock()
+        self.not_empty = threading.Condition(lock)
+        self.not_full = threading.Condition(lock)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def put(self, item, bounded: bool = True):
+        """Add an item; unbounded puts are for end-of-stream markers, which must never be lost"""
+        with self.not_full:
+            if bounded:
+                while len(self.items) >= self.maxsize:
+                    if self.drop_oldest and self.items[0] is not _DONE:
+                        self.items.popleft()
+                        self.dropped += 1
+                        break
+                    self.not_full.wait()
+            self.items.append(item)
+            self.not_empty.notify()
+
+    def get(self):
+        with self.not_empty:
+            while not self.items:
+                self.not_empty.wait()
+            item = self.items.popleft()
+            self.not_full.notify()
+            return item
+
+    def get_many(self, limit: int) -> list:
+        """Wait for one item, then also take up to limit - 1 more that are already waiting
+
+        Stops after an end-of-stream marker so each consumer takes only one.
+        """
+        with self.not_empty:
+            while not self.items:
+                self.not_empty.wait()
+            taken = []
+            while self.items and len(taken) < limit:
+                taken.append(self.items.popleft())
+                if taken[-1] is _DONE:
+                    break
+            self.not_full.notify(len(taken))
+            return taken
+
+
+def _parse_in_worker(lines: List[str]) -> List[Dict[str, Any]]:
+    from parallel import _parser
+
+    return [_parser.parse_error(line) for line in lines]
+
+
+def _explain_in_worker(parsed_errors: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    from parallel import _generator
+
+    return _generator.generate_explanations(parsed_errors)
+
+
+class Pipeline:
+    """Read, parse, explain and emit stages joined by bounded queues
+
+    Memory stays bounded however fast lines arrive. When a stage falls
+    behind, the policy decides what happens to new work: 'block' slows the
+    reader down, 'drop_oldest' discards the oldest waiting lines, and
+    'sample' keeps one in sample_rate lines of each error type while the
+    explain queue is under pressure. Results already explained are never
+    dropped. With more than one worker, results may be emitted out of order.
+
+    With batch_size above 1, parse and explain take and return lists, and
+    each call gets whatever is already waiting, up to batch_size items.
+    """
+
+    def __init__(self, parse: Callable, explain: Callable, workers: int = 1, policy: str = 'block',
+                 queue_size: int = DEFAULT_QUEUE_SIZE, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                 batch_size: int = 1):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown overflow policy '{policy}', expected one of: {', '.join(POLICIES)}")
+        if sample_rate < 1:
+            raise ValueError("sample rate must be at least 1")
+        if batch_size > 1:
+            self.parse_batch, self.explain_batch = parse, explain
+        else:
+            self.parse_batch = lambda lines: [parse(line) for line in lines]
+            self.explain_batch = lambda parsed_errors: [explain(parsed_error) for parsed_error in parsed_errors]
+        self.batch_size = max(batch_size, 1)
+        self.workers = max(workers, 1)
+        self.policy = policy
+        self.sample_rate = sample_rate
+        drop_oldest = policy == 'drop_oldest'
+        self.lines = BoundedQueue(queue_size, drop_oldest)
+        self.parsed = BoundedQueue(queue_size, drop_oldest)
+        self.explained = BoundedQueue(queue_size)
+        self.read = 0
+        self.emitted = 0
+        self.sampled = Counter()
+        self.seen_types = Counter()
+        self.error: Optional[Exception] = None
+        self.pool = None
+        self.lock = threading.Lock()
+        self.running = {'parse': self.workers, 'explain': self.workers}
+
+    @classmethod
+    def for_cognito(cls, cognito, processes: bool = False, **options) -> 'Pipeline':
+        """A pipeline around a Cognito's parser and generator, or around worker processes
+
+        Worker processes build their own parser from the same knowledge
+        packs, as with --jobs, so other parser front ends only apply to threads.
+        """
+        if not processes:
+            return cls(cognito.parser.parse_error, cognito.generator.generate_explanation, **options)
+        from concurrent.futures import ProcessPoolExecutor
+        from parallel import _init_worker
+
+        pool = ProcessPoolExecutor(max(options.get('workers', 1), 1), initializer=_init_worker,
+                                   initargs=(cognito.parser.max_line_length, cognito.pack_paths()))
+        pipeline = cls(lambda lines: pool.submit(_parse_in_worker, lines).result(),
+                       lambda parsed_errors: pool.submit(_explain_in_worker, parsed_errors).result(),
+                       batch_size=PROCESS_BATCH_SIZE, **options)
+        pipeline.pool = pool
+        return pipeline
+
+    def _read(self, source: Iterable[str]):
+        try:
+            for line in source:
+                self.read += 1
+                self.lines.put(line)
+        except Exception as e:
+            self.error = self.error or e
+        finally:
+            for _ in range(self.workers):
+                self.lines.put(_DONE, bounded=False)
+
+    def _keep(self, error_type: str) -> bool:
+        """Sample policy: under pressure, keep the first of every sample_rate lines of a type"""
+        with self.lock:
+            count = self.seen_types[error_type]
+            self.seen_types[error_type] += 1
+            if len(self.parsed) < self.parsed.maxsize * SAMPLE_PRESSURE or count % self.sample_rate == 0:
+                return True
+            self.sampled[error_type] += 1
+            return False
+
+    def _finish(self, stage: str, downstream: BoundedQueue, markers: int):
+        with self.lock:
+            self.running[stage] -= 1
+            last = not self.running[stage]
+        if last:
+            for _ in range(markers):
+                downstream.put(_DONE, bounded=False)
+
+    def _batches(self, queue: BoundedQueue) -> Iterator[list]:
+        """Batches of waiting items until this worker takes an end-of-stream marker"""
+        while True:
+            items = queue.get_many(self.batch_size)
+            done = items[-1] is _DONE
+            if done:
+                items.pop()
+            if items and self.error is None:
+                yield items
+            if done:
+                return
+
+    def _parse_worker(self):
+        sample = self.policy == 'sample'
+        for lines in self._batches(self.lines):
+            try:
+                for parsed_error in self.parse_batch(lines):
+                    if not sample or self._keep(parsed_error['error_type']):
+                        self.parsed.put(parsed_error)
+            except Exception as e:
+                self.error = self.error or e
+        self._finish('parse', self.parsed, self.workers)
+
+    def _explain_worker(self):
+        for parsed_errors in self._batches(self.parsed):
+            try:
+                for explanation in self.explain_batch(parsed_errors):
+                    self.explained.put(explanation)
+            except Exception as e:
+                self.error = self.error or e
+        self._finish('explain', self.explained, 1)
+
+    def run(self, source: Iterable[str]) -> Iterator[Dict[str, Any]]:
+        """Yield explanations for the lines of source, raising the first stage error at the end"""
+        threads = [threading.Thread(target=self._read, args=(source,), daemon=True)]
+        threads += [threading.Thread(target=self._parse_worker, daemon=True) for _ in range(self.workers)]
+        threads += [threading.Thread(target=self._explain_worker, daemon=True) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                explanation = self.explained.get()
+                if explanation is _DONE:
+                    break
+                self.emitted += 1
+                yield explanation
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown(cancel_futures=True)
+        if self.error is not None:
+            raise self.error
+
+    def counters(self) -> Dict[str, Any]:
+        return {
+            'read': self.read,
+            'emitted': self.emitted,
+            'dropped': self.lines.dropped + self.parsed.dropped,
+            'sampled': sum(self.sampled.values()),
+            'sampled_types': dict(self.sampled.most_common())
+        }
+
+
+def format_counters(counters: Dict[str, Any]) -> str:
+    text = (f"Pipeline: read {counters['read']}, emitted {counters['emitted']}, "
+            f"dropped {counters['dropped']}, sampled {counters['sampled']}")
+    if counters['sampled_types']:
+        text += " (" + ', '.join(f"{error_type} {count}" for error_type, count in
+                                 counters['sampled_types'].items()) + ")"
+    return text
@@ -0,0 +1,148 @@
+import time
+from functools import wraps
+from typing import Any, Dict, List
+
+STAGES = ('parse', 'classify', 'extract', 'confidence', 'explain', 'render')
+BUCKETS = 24
+
+
+def _bucket(nanoseconds: int) -> int:
+    """Log2 latency bucket: 0 is under 1us, k covers [2**(k-1), 2**k) us"""
+    return min((nanoseconds // 1000).bit_length(), BUCKETS - 1)
+
+
+def _bucket_label(index: int) -> str:
+    return '<1us' if index == 0 else f"<{2 ** index}us"
+
+
+class Timing:
+    """Call count, total time and a log2 latency histogram"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.histogram = [0] * BUCKETS
+
+    def add(self, nanoseconds: int):
+        self.count += 1
+        self.total_ns += nanoseconds
+        self.histogram[_bucket(nanoseconds)] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': self.total_ns / 1e6,
+            'mean_us': self.total_ns / self.count / 1e3 if self.count else 0.0,
+            'histogram': {_bucket_label(i): n for i, n in enumerate(self.histogram) if n}
+        }
+
+
+class PipelineStats:
+    """Per-stage timings and per-pattern hit counts for an instrumented Cognito
+
+    Instrumentation wraps methods on the instances it is attached to, so an
+    uninstrumented Cognito pays nothing for this module.
+    """
+
+    def __init__(self):
+        self.stages = {stage: Timing() for stage in STAGES}
+        self.entries = []
+        self.pattern_times: List[Timing] = []
+        self.pattern_hits: List[int] = []
+        self.messages = 0
+
+    def _timed(self, stage: str, func):
+        timing = self.stages[stage]
+        clock = time.perf_counter_ns
+
+        @wraps(func)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timing.add(clock() - start)
+        return timed
+
+    def _observe_pattern(self, index: int, matched: bool, nanoseconds: int):
+        self.pattern_times[index].add(nanoseconds)
+        if matched:
+            self.pattern_hits[index] += 1
+
+    def instrument(self, cognito) -> 'PipelineStats':
+        """Attach timing to a Cognito's parser, pattern engine, generator and renderer"""
+        parser = cognito.parser
+        while hasattr(parser, 'parser'):
+            # Look through cache and similarity front ends to the real ErrorParser
+            parser = parser.parser
+        engine = parser.engine
+        self.entries = list(engine.entries)
+        self.pattern_times = [Timing() for _ in self.entries]
+        self.pattern_hits = [0] * len(self.entries)
+
+        # The classify stage times the engine's own match path; each pattern is
+        # then timed on its own in a separate pass that is not counted there
+        match = self._timed('classify', engine.match)
+
+        def profiled_match(error_message):
+            self.messages += 1
+            result = match(error_message)
+            engine.match_each(error_message, self._observe_pattern)
+            return result
+
+        engine.match = profiled_match
+        parser.extract_components = self._timed('extract', parser.extract_components)
+        parser.confidence_from_match = self._timed('confidence', parser.confidence_from_match)
+        cognito.parser.parse_error = self._timed('parse', cognito.parser.parse_error)
+        cognito.generator.generate_explanation = self._timed('explain', cognito.generator.generate_explanation)
+        cognito.display_explanation = self._timed('render', cognito.display_explanation)
+        return self
+
+    def report(self) -> Dict[str, Any]:
+        """Return stage timings and per-pattern statistics, most expensive pattern first"""
+        patterns = []
+        for index, (table, error_type, pattern) in enumerate(self.entries):
+            timing = self.pattern_times[index].to_dict()
+            patterns.append({
+                'table': table,
+                'error_type': error_type,
+                'pattern': pattern,
+                'evaluations': timing['count'],
+                'hits': self.pattern_hits[index],
+                'total_ms': timing['total_ms'],
+                'mean_us': timing['mean_us']
+            })
+        patterns.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return {
+            'messages': self.messages,
+            'stages': {stage: timing.to_dict() for stage, timing in self.stages.items()},
+            'patterns': patterns
+        }
+
+    def format_report(self, top: int = 15) -> str:
+        """Render the report as text histograms"""
+        report = self.report()
+        lines = ["", "=" * 50, "COGNITO STATS", "=" * 50, f"Messages classified: {report['messages']}", "", "Stages:"]
+        for stage, timing in report['stages'].items():
+            if not timing['count']:
+                continue
+            lines.append(f"   {stage:<11}{timing['count']:>9} calls {timing['total_ms']:>10.2f} ms "
+                         f"{timing['mean_us']:>9.2f} us/call")
+            peak = max(timing['histogram'].values())
+            for label, count in timing['histogram'].items():
+                lines.append(f"      {label:>9} {'#' * max(1, count * 30 // peak)} {count}")
+
+        lines.append("")
+        lines.append(f"Most expensive patterns (of {len(report['patterns'])}):")
+        for entry in report['patterns'][:top]:
+            lines.append(f"   {entry['total_ms']:>9.2f} ms {entry['evaluations']:>8} evals {entry['hits']:>8} hits  "
+                         f"{entry['error_type']}: {entry['pattern']}")
+
+        never = [entry for entry in report['patterns'] if entry['hits'] == 0]
+        if never and report['messages']:
+            lines.append("")
+            lines.append(f"Patterns that never matched ({len(never)}):")
+            for entry in never:
+                lines.append(f"   {entry['table']} {entry['error_type']}: {entry['pattern']}")
+        lines.append("=" * 50)
+        return '\n'.join(lines)
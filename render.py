@@ -0,0 +1,106 @@
+import json
+import sys
+
+
+def format_explanation(explanation: dict) -> str:
+    """Render an explanation as the human-readable analysis block"""
+    lines = [
+        "",
+        "=" * 50,
+        "COGNITO ANALYSIS",
+        "=" * 50,
+        f"Type: {explanation['error_type'].replace('_', ' ').title()}",
+        f"Severity: {explanation['severity'].upper()}",
+        f"Summary: {explanation['summary']}",
+        f"Cause: {explanation['likely_cause']}",
+        "",
+        "Solutions:"
+    ]
+    for i, solution in enumerate(explanation['solutions'], 1):
+        lines.append(f"   {i}. {solution}")
+    
+    if explanation['prevention_tips']:
+        lines.append("")
+        lines.append("Prevention:")
+        for tip in explanation['prevention_tips']:
+            lines.append(f"   - {tip}")
+    
+    if explanation.get('related_errors'):
+        lines.append("")
+        lines.append("Possibly related:")
+        for related in explanation['related_errors']:
+            lines.append(f"   - {related['error_type'].replace('_', ' ').title()} (score {related['score']:.1f})")
+    
+    lines.append("")
+    lines.append(f"Confidence: {explanation['confidence']:.0%}")
+    lines.append("=" * 50)
+    return "\n".join(lines)
+
+
+OUTPUT_FORMATS = ('text', 'json', 'ndjson')
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
+
+class OutputWriter:
+    """Buffers rendered results and writes them to a stream in bulk
+
+    "text" renders the analysis block, "ndjson" writes one JSON object per
+    line and "json" writes a single array. Output to a terminal is flushed
+    after every record so interactive use stays responsive.
+    """
+
+    def __init__(self, stream, output_format: str = 'text', buffer_size: int = DEFAULT_BUFFER_SIZE):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"unknown output format: {output_format}")
+        self.stream = stream
+        self.format = output_format
+        self.buffer_size = buffer_size
+        self.autoflush = stream.isatty()
+        self.pending = []
+        self.pending_size = 0
+        self.records = 0
+
+    def _render(self, record: dict) -> str:
+        if self.format == 'text':
+            return format_explanation(record) + "\n"
+        encoded = json.dumps(record, default=str)
+        if self.format == 'ndjson':
+            return encoded + "\n"
+        return ("[\n" if self.records == 0 else ",\n") + encoded
+
+    def write(self, record: dict):
+        """Queue one explanation, or any JSON-serializable record in the JSON formats"""
+        text = self._render(record)
+        self.records += 1
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.autoflush or self.pending_size >= self.buffer_size:
+            self.flush()
+
+    def write_text(self, text: str):
+        """Queue pre-rendered text; only meaningful in text format"""
+        self.pending.append(text + "\n")
+        self.pending_size += len(text) + 1
+        if self.autoflush or self.pending_size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.stream.write(''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+        self.stream.flush()
+
+    def close(self):
+        """Finish the JSON array if needed and flush everything"""
+        if self.format == 'json':
+            self.pending.append("\n]\n" if self.records else "[]\n")
+        self.flush()
+        if self.stream not in (sys.stdout, sys.stderr):
+            self.stream.close()
+
+
+def open_output(output_format: str = 'text', path: str = None) -> OutputWriter:
+    """Create a writer for stdout, or for a file when path is given"""
+    stream = open(path, 'w', encoding='utf-8') if path and path != '-' else sys.stdout
+    return OutputWriter(stream, output_format)
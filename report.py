@@ -0,0 +1,201 @@
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+DEFAULT_TOP_K = 10
+DEFAULT_WINDOW = 3600
+DEFAULT_MAX_WINDOWS = 168
+REPORTED_COMPONENTS = ('command', 'filename', 'repository', 'resource')
+COMPONENT_TITLES = {'command': 'Commands', 'filename': 'Files', 'repository': 'Repositories',
+                    'resource': 'Resources'}
+
+_ISO_TIMESTAMP = re.compile(r"\[?(\d{4}-\d{2}-\d{2})[T ](\d{2}):(\d{2}):(\d{2})")
+_SYSLOG_TIMESTAMP = re.compile(r"([A-Z][a-z]{2} [ \d]\d) (\d{2}):(\d{2}):(\d{2})")
+
+
+class SpaceSaving:
+    """Heavy-hitter sketch that tracks at most capacity distinct items
+
+    When a new item arrives at a full table it replaces the item with the
+    lowest count and inherits that count as its overestimate, so every
+    item seen more than total/capacity times is guaranteed to be kept.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.total = 0
+
+    def add(self, item: str, count: int = 1):
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            return
+        victim = min(counts, key=counts.__getitem__)
+        floor = counts.pop(victim)
+        del self.errors[victim]
+        counts[item] = floor + count
+        self.errors[item] = floor
+
+    def merge(self, other: 'SpaceSaving'):
+        """Fold another sketch in; items missing from a full sketch get its minimum as error"""
+        own_floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        other_floor = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        counts = {}
+        errors = {}
+        for item in self.counts.keys() | other.counts.keys():
+            counts[item] = self.counts.get(item, own_floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, own_floor) + other.errors.get(item, other_floor)
+        kept = sorted(counts, key=counts.__getitem__, reverse=True)[:self.capacity]
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self.total += other.total
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """The k largest (item, estimated count, maximum overestimate) entries"""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+
+def time_window(line: str, window: int) -> str:
+    """Label of the window a line's leading timestamp falls in, or '' if it has none"""
+    match = _ISO_TIMESTAMP.match(line) or _SYSLOG_TIMESTAMP.match(line)
+    if match is None:
+        return ''
+    day, hours, minutes, seconds = match.groups()
+    start = (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) // window * window
+    return f"{day} {start // 3600:02d}:{start % 3600 // 60:02d}"
+
+
+class StreamReport:
+    """Bounded-memory summary of a log stream
+
+    Keeps exact counts per error type and severity, SpaceSaving sketches for
+    the most frequent commands, files, repositories and resources, and error
+    counts for the most recent max_windows time windows. Memory depends on
+    top_k and max_windows, not on the number of lines or distinct values.
+    """
+
+    def __init__(self, parser, generator, top_k: int = DEFAULT_TOP_K, window: int = DEFAULT_WINDOW,
+                 max_windows: int = DEFAULT_MAX_WINDOWS):
+        # Window labels show hours and minutes
+        if not 0 < window <= 86400 or 86400 % window or window % 60:
+            raise ValueError("window must be a whole number of minutes that divides a day")
+        self.parser = parser
+        self.generator = generator
+        self.top_k = top_k
+        self.window = window
+        self.max_windows = max_windows
+        self.lines = 0
+        self.error_types = Counter()
+        self.severities = Counter()
+        # Several times more slots than reported keeps the top k accurate
+        self.components = {name: SpaceSaving(top_k * 10) for name in REPORTED_COMPONENTS}
+        self.windows: Dict[str, Counter] = {}
+        self.dropped_windows = 0
+
+    def add(self, line: str):
+        # parse_error goes through any parser front ends, such as --model or --record
+        parsed_error = self.parser.parse_error(line)
+        error_type = parsed_error['error_type']
+        self.lines += 1
+        self.error_types[error_type] += 1
+        self.severities[self.generator.assess_severity(error_type)] += 1
+
+        for name, value in parsed_error['components'].items():
+            sketch = self.components.get(name)
+            if sketch is not None:
+                sketch.add(value)
+
+        if error_type != 'unknown':
+            label = time_window(line, self.window)
+            if label:
+                self._count_window(label, error_type, 1)
+
+    def _count_window(self, label: str, error_type: str, count: int):
+        counts = self.windows.get(label)
+        if counts is None:
+            if len(self.windows) >= self.max_windows:
+                # Logs are mostly in time order, so the oldest window is the first inserted
+                del self.windows[next(iter(self.windows))]
+                self.dropped_windows += 1
+            counts = self.windows[label] = Counter()
+        counts[error_type] += count
+
+    def add_lines(self, lines: Iterable[str]) -> 'StreamReport':
+        add = self.add
+        for line in lines:
+            add(line)
+        return self
+
+    def merge(self, other: 'StreamReport'):
+        """Fold in a report built over another part of the input"""
+        self.lines += other.lines
+        self.error_types.update(other.error_types)
+        self.severities.update(other.severities)
+        for name, sketch in other.components.items():
+            self.components[name].merge(sketch)
+        for label, counts in other.windows.items():
+            for error_type, count in counts.items():
+                self._count_window(label, error_type, count)
+        self.dropped_windows += other.dropped_windows
+
+    def __getstate__(self):
+        # Workers send reports back to the parent without their parser
+        state = dict(self.__dict__)
+        state['parser'] = state['generator'] = None
+        return state
+
+    def result(self) -> Dict[str, Any]:
+        """The report as plain, JSON-serializable data"""
+        return {
+            'lines': self.lines,
+            'error_types': dict(self.error_types.most_common()),
+            'severities': dict(self.severities.most_common()),
+            'top': {
+                name: [{'value': value, 'count': count, 'max_overcount': error}
+                       for value, count, error in sketch.top(self.top_k)]
+                for name, sketch in self.components.items() if sketch.counts
+            },
+            'window_seconds': self.window,
+            'windows': [{'start': label, 'error_types': dict(counts.most_common())}
+                        for label, counts in sorted(self.windows.items())],
+            'dropped_windows': self.dropped_windows
+        }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a report result as text"""
+    lines = ["", "=" * 50, "COGNITO REPORT", "=" * 50, f"Lines analyzed: {report['lines']}"]
+
+    lines.append("\nError types:")
+    for error_type, count in report['error_types'].items():
+        lines.append(f"   {error_type.replace('_', ' ').title()}: {count}")
+
+    lines.append("\nSeverity:")
+    for severity, count in report['severities'].items():
+        lines.append(f"   {severity.upper()}: {count}")
+
+    for name, entries in report['top'].items():
+        lines.append(f"\nTop {COMPONENT_TITLES.get(name, name).lower()}:")
+        for entry in entries:
+            approximate = f" (+/-{entry['max_overcount']})" if entry['max_overcount'] else ""
+            lines.append(f"   {entry['value']}: {entry['count']}{approximate}")
+
+    if report['windows']:
+        lines.append(f"\nErrors per {report['window_seconds'] // 60} minutes:")
+        for window in report['windows']:
+            counts = ', '.join(f"{error_type.replace('_', ' ')} {count}"
+                               for error_type, count in window['error_types'].items())
+            lines.append(f"   {window['start']}  {counts}")
+        if report['dropped_windows']:
+            lines.append(f"   ({report['dropped_windows']} older windows dropped)")
+
+    lines.append("=" * 50)
+    return "\n".join(lines)
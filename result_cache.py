@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_MAX_SIZE = 10000
+CACHE_VERSION = 2
+
+# Masks for the parts of a message that vary between repeats of the same error.
+# Three-digit numbers are kept because patterns such as "404 Not Found" rely on them.
+_MASKS = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"), '<TS>'),
+    (re.compile(r"\b\d{1,2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), '<TIME>'),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), '<HEX>'),
+    (re.compile(r"\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b"), '<HEX>'),
+    (re.compile(r"(?<![\w.])(?:~|\.{1,2})?(?:/[^\s/'\":]+)+/?"), '<PATH>'),
+    (re.compile(r"\[\d+\]"), '[<PID>]'),
+    (re.compile(r"\b\d+\.\d+\b|\b\d{4,}\b"), '<NUM>'),
+]
+
+
+def normalize_message(error_message: str, keep: Optional[re.Pattern] = None) -> str:
+    """Mask timestamps, addresses, paths and long numbers in a message
+
+    Spans in which keep finds a match once lowercased are left as they are.
+    """
+    for pattern, replacement in _MASKS:
+        if keep is None:
+            error_message = pattern.sub(replacement, error_message)
+        else:
+            error_message = pattern.sub(
+                lambda span: span.group(0) if keep.search(span.group(0).lower()) else replacement, error_message)
+    return error_message.strip()
+
+
+def keyword_pattern(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """Regex finding any word or number of two or more characters spelled out in the patterns
+
+    It is meant for lowercased text. A masked span holding one of these may
+    be what a pattern matched, as in "open /etc/file.conf failed" or
+    "wget https://example.com/timeout/x".
+    """
+    words = set()
+    for pattern in patterns:
+        # Drop escapes such as \d and \b so their letters do not count as words
+        words.update(re.findall(r"[a-z0-9]{2,}", re.sub(r"\\[a-zA-Z]", " ", pattern.lower())))
+    if not words:
+        return None
+    return re.compile('|'.join(re.escape(word) for word in sorted(words, key=len, reverse=True)))
+
+
+class CachedParser:
+    """ErrorParser front end that remembers classifications of normalized messages
+
+    Paths, URLs and numbers that contain a word from the pattern tables are
+    not masked, so they never share an entry with ones that do not.
+    """
+
+    def __init__(self, parser, max_size: int = DEFAULT_MAX_SIZE):
+        self.parser = parser
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.fingerprint = hashlib.sha1(repr(parser.engine.entries).encode()).hexdigest()
+        self.keep = keyword_pattern(pattern for _, _, pattern in parser.engine.entries)
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+    def with_parser(self, parser, generator) -> 'CachedParser':
+        """An empty cache around another parser, as cached classifications came from the old tables"""
+        return CachedParser(parser, self.max_size)
+
+    def parse_error(self, error_message: str) -> Dict[str, Any]:
+        """Parse error message, reusing the classification of an equivalent message"""
+        key = normalize_message(error_message, self.keep)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            match = self.parser.engine.match(self.parser.window(error_message))
+            entry = (match.error_type, self.parser.confidence_from_match(match, match.error_type))
+            self.entries[key] = entry
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+
+        error_type, confidence = entry
+        # Components come from the real message so explanations name the actual file or command
+        return {
+            'original_message': error_message,
+            'error_type': error_type,
+            'components': self.parser.extract_components(error_message, error_type),
+            'confidence': confidence,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache size and hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def load(self, path: str) -> int:
+        """Warm the cache from a file written by save(), returning the entries loaded"""
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return 0
+
+        # Entries classified by different pattern tables are stale
+        if data.get('version') != CACHE_VERSION or data.get('fingerprint') != self.fingerprint:
+            return 0
+
+        loaded = 0
+        for key, error_type, confidence in data.get('entries', [])[-self.max_size:]:
+            self.entries[key] = (error_type, confidence)
+            loaded += 1
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return loaded
+
+    def save(self, path: str):
+        """Write the cache to a file, least recently used entries first"""
+        data = {
+            'version': CACHE_VERSION,
+            'fingerprint': self.fingerprint,
+            'entries': [[key, error_type, confidence] for key, (error_type, confidence) in self.entries.items()]
+        }
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle)
+        os.replace(temp_path, path)
@@ -0,0 +1,236 @@
+import re
+import sqlite3
+import threading
+import zlib
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from result_cache import normalize_message
+
+SIGNATURE_SIZE = 60
+BANDS = 20
+ROWS = SIGNATURE_SIZE // BANDS
+DEFAULT_THRESHOLD = 0.5
+LEARN_CONFIDENCE = 0.5
+MAX_CANDIDATES = 64
+COMMIT_EVERY = 1000
+MAX_SEEN = 100000
+# Bump when shingles() changes, so stored signatures are recomputed
+INDEX_VERSION = 2
+# Words nearly every message has; sharing only these says nothing about the error
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'been', 'but', 'by', 'can', 'for', 'from', 'has', 'have', 'in',
+    'installed', 'is', 'it', 'its', 'not', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'will', 'with',
+))
+_EMPTY_BIN = 0xFFFFFFFF
+_WORD_RE = re.compile(r"[a-z0-9<>_']+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    normalized TEXT UNIQUE NOT NULL,
+    signature BLOB NOT NULL,
+    error_type TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    key INTEGER NOT NULL,
+    entry INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key);
+"""
+
+
+def shingles(normalized: str) -> List[str]:
+    """Distinct words of a normalized message other than stopwords
+
+    Word order is left out so rephrasings still overlap.
+    """
+    return list(set(_WORD_RE.findall(normalized.lower())).difference(STOPWORDS))
+
+
+def jaccard(first: List[str], second: List[str]) -> float:
+    """Shared words over all words of two shingle lists"""
+    first, second = set(first), set(second)
+    union = len(first | second)
+    return len(first & second) / union if union else 0.0
+
+
+def signature(features: List[str]) -> array:
+    """One-permutation MinHash: the smallest hash per bin, empty bins borrowed from the next one"""
+    bins = [_EMPTY_BIN] * SIGNATURE_SIZE
+    for feature in features:
+        value = zlib.crc32(feature.encode('utf-8'))
+        slot = value % SIGNATURE_SIZE
+        rank = value // SIGNATURE_SIZE
+        if rank < bins[slot]:
+            bins[slot] = rank
+    if features and _EMPTY_BIN in bins:
+        # Walk backwards from a filled bin so each empty one takes the next filled value
+        first = next(slot for slot, rank in enumerate(bins) if rank != _EMPTY_BIN)
+        carry = bins[first]
+        for step in range(1, SIGNATURE_SIZE):
+            slot = (first - step) % SIGNATURE_SIZE
+            if bins[slot] == _EMPTY_BIN:
+                bins[slot] = carry
+            else:
+                carry = bins[slot]
+    return array('I', bins)
+
+
+def band_keys(sig: array) -> List[int]:
+    """LSH bucket keys: messages sharing any band are compared"""
+    raw = sig.tobytes()
+    width = ROWS * sig.itemsize
+    return [(band << 32) | zlib.crc32(raw[band * width:(band + 1) * width]) for band in range(BANDS)]
+
+
+class SimilarityIndex:
+    """On-disk MinHash/LSH index of messages with known classifications
+
+    Lookups hash a message once, read the entries that share an LSH band
+    through an SQLite index, and return the one whose words have the
+    highest Jaccard similarity, if it reaches the threshold. One index may
+    be shared by the threads of a pipeline; a lock serializes its use.
+    """
+
+    def __init__(self, path: str, threshold: float = DEFAULT_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.connection.executescript(_SCHEMA)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self._rehash()
+        self.pending = 0
+        # Recent lookups by normalized message; any add may change them
+        self.lookups: Dict[str, Optional[Dict[str, Any]]] = {}
+        # Normalized messages already offered this session, so repeats skip hashing
+        self.seen = set()
+
+    def _rehash(self):
+        """Recompute every signature and bucket from the stored normalized messages"""
+        with self.connection:
+            self.connection.execute("DELETE FROM buckets")
+            entries = self.connection.execute("SELECT id, normalized FROM entries").fetchall()
+            for entry, normalized in entries:
+                sig = signature(shingles(normalized))
+                self.connection.execute("UPDATE entries SET signature = ? WHERE id = ?", (sig.tobytes(), entry))
+                self.connection.executemany("INSERT INTO buckets (key, entry) VALUES (?, ?)",
+                                            [(key, entry) for key in band_keys(sig)])
+            self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def add(self, message: str, error_type: str, confidence: float) -> bool:
+        """Remember a classified message; returns False if an equivalent one is stored"""
+        normalized = normalize_message(message)
+        with self.lock:
+            return self._add(normalized, message, error_type, confidence)
+
+    def _add(self, normalized: str, message: str, error_type: str, confidence: float) -> bool:
+        if normalized in self.seen:
+            return False
+        if len(self.seen) >= MAX_SEEN:
+            self.seen.clear()
+        self.seen.add(normalized)
+        sig = signature(shingles(normalized))
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO entries (normalized, signature, error_type, confidence, message) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (normalized, sig.tobytes(), error_type, confidence, message))
+        if not cursor.rowcount:
+            return False
+        self.connection.executemany("INSERT INTO buckets (key, entry) VALUES (?, ?)",
+                                    [(key, cursor.lastrowid) for key in band_keys(sig)])
+        self.lookups.clear()
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self._commit()
+        return True
+
+    def lookup(self, message: str) -> Optional[Dict[str, Any]]:
+        """Return the most similar stored entry at or above the threshold, or None"""
+        normalized = normalize_message(message)
+        with self.lock:
+            if normalized in self.lookups:
+                return self.lookups[normalized]
+            if len(self.lookups) >= MAX_SEEN:
+                self.lookups.clear()
+            found = self.lookups[normalized] = self._lookup(shingles(normalized))
+            return found
+
+    def _lookup(self, words: List[str]) -> Optional[Dict[str, Any]]:
+        sig = signature(words)
+        keys = band_keys(sig)
+        rows = self.connection.execute(
+            "SELECT normalized, error_type, confidence, message FROM entries WHERE id IN "
+            f"(SELECT entry FROM buckets WHERE key IN ({','.join('?' * len(keys))}) LIMIT {MAX_CANDIDATES})",
+            keys).fetchall()
+
+        best: Optional[Tuple[float, tuple]] = None
+        for row in rows:
+            # MinHash estimates are noisy for messages of a few words, so compare the words themselves
+            similarity = jaccard(words, shingles(row[0]))
+            if similarity >= self.threshold and (best is None or similarity > best[0]):
+                best = (similarity, row)
+        if best is None:
+            return None
+        similarity, (_, error_type, confidence, example) = best
+        return {'error_type': error_type, 'confidence': confidence, 'similarity': similarity,
+                'message': example}
+
+    def commit(self):
+        with self.lock:
+            self._commit()
+
+    def _commit(self):
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self._commit()
+            self.connection.close()
+
+
+class SimilarParser:
+    """ErrorParser front end that learns confident classifications and reuses them for near-duplicates
+
+    Messages the pattern tables cannot classify take the type of the closest
+    stored message, with confidence scaled by how similar the two are.
+    Components are still extracted from the new message itself.
+    """
+
+    def __init__(self, parser, index: SimilarityIndex, learn_confidence: float = LEARN_CONFIDENCE):
+        self.parser = parser
+        self.index = index
+        self.learn_confidence = learn_confidence
+        self.learned = 0
+        self.reused = 0
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+    def with_parser(self, parser, generator) -> 'SimilarParser':
+        """The same front end around another parser"""
+        return SimilarParser(parser, self.index, self.learn_confidence)
+
+    def parse_error(self, error_message: str) -> Dict[str, Any]:
+        parsed_error = self.parser.parse_error(error_message)
+        text = self.parser.window(error_message)
+        if parsed_error['error_type'] == 'unknown':
+            similar = self.index.lookup(text)
+            if similar is not None:
+                self.reused += 1
+                parsed_error['error_type'] = similar['error_type']
+                parsed_error['components'] = self.parser.extract_components(text, similar['error_type'])
+                parsed_error['confidence'] = round(similar['confidence'] * similar['similarity'], 2)
+                parsed_error['similar_to'] = similar['message']
+        elif parsed_error['confidence'] >= self.learn_confidence:
+            if self.index.add(text, parsed_error['error_type'], parsed_error['confidence']):
+                self.learned += 1
+        return parsed_error
@@ -0,0 +1,121 @@
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from result_cache import normalize_message
+
+WILDCARD = '<*>'
+
+
+class LogCluster:
+    """A group of log lines sharing one template"""
+
+    def __init__(self, cluster_id: int, tokens: List[str], parsed_error: Dict[str, Any]):
+        self.cluster_id = cluster_id
+        self.tokens = tokens
+        self.parsed_error = parsed_error
+        self.count = 0
+        self.samples: Dict[str, Counter] = {}
+
+    @property
+    def template(self) -> str:
+        return ' '.join(self.tokens)
+
+    def similarity(self, tokens: List[str]) -> float:
+        """Fraction of positions where tokens agree with the template"""
+        same = sum(1 for ours, theirs in zip(self.tokens, tokens) if ours == theirs)
+        return same / len(tokens) if tokens else 1.0
+
+    def merge(self, tokens: List[str]):
+        """Widen the template to cover tokens"""
+        for i, (ours, theirs) in enumerate(zip(self.tokens, tokens)):
+            if ours != theirs:
+                self.tokens[i] = WILDCARD
+
+    def add_samples(self, components: Dict[str, str], max_samples: int):
+        """Count component values, keeping at most max_samples distinct values each"""
+        for name, value in components.items():
+            values = self.samples.setdefault(name, Counter())
+            if value in values or len(values) < max_samples:
+                values[value] += 1
+
+
+class TemplateMiner:
+    """Online Drain-style grouping of log lines into templates with variable slots"""
+
+    def __init__(self, parser, depth: int = 3, similarity_threshold: float = 0.5,
+                 max_children: int = 100, max_samples: int = 10):
+        self.parser = parser
+        self.depth = max(depth, 3)
+        self.similarity_threshold = similarity_threshold
+        self.max_children = max_children
+        self.max_samples = max_samples
+        self.root: Dict[int, dict] = {}
+        self.clusters: List[LogCluster] = []
+        self.lines = 0
+
+    def tokenize(self, line: str) -> List[str]:
+        return normalize_message(line).split()
+
+    def _leaf(self, tokens: List[str]) -> list:
+        """Walk the prefix tree by token count and leading tokens, creating nodes as needed"""
+        node = self.root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth - 2]:
+            if any(c.isdigit() for c in token) or token.startswith('<'):
+                token = WILDCARD
+            if token not in node:
+                if len(node) >= self.max_children - 1 and token != WILDCARD:
+                    token = WILDCARD
+                node = node.setdefault(token, {})
+            else:
+                node = node[token]
+        return node.setdefault(None, [])
+
+    def _best_cluster(self, leaf: list, tokens: List[str]) -> Optional[LogCluster]:
+        best = None
+        best_similarity = -1.0
+        for cluster in leaf:
+            similarity = cluster.similarity(tokens)
+            if similarity > best_similarity:
+                best, best_similarity = cluster, similarity
+        if best is not None and best_similarity >= self.similarity_threshold:
+            return best
+        return None
+
+    def add_line(self, line: str) -> LogCluster:
+        """Assign a line to a template, classifying only the first line of each template"""
+        self.lines += 1
+        tokens = self.tokenize(line)
+        leaf = self._leaf(tokens)
+        cluster = self._best_cluster(leaf, tokens)
+        if cluster is None:
+            cluster = LogCluster(len(self.clusters), tokens, self.parser.parse_error(line))
+            leaf.append(cluster)
+            self.clusters.append(cluster)
+        else:
+            cluster.merge(tokens)
+
+        cluster.count += 1
+        error_type = cluster.parsed_error['error_type']
+        cluster.add_samples(self.parser.extract_components(line, error_type), self.max_samples)
+        return cluster
+
+    def add_lines(self, lines) -> 'TemplateMiner':
+        for line in lines:
+            self.add_line(line)
+        return self
+
+    def summarize(self, generator) -> List[Dict[str, Any]]:
+        """Explain each template once, most frequent first"""
+        summary = []
+        for cluster in sorted(self.clusters, key=lambda c: c.count, reverse=True):
+            # Only components shared by every line may customize the template's explanation
+            parsed_error = dict(cluster.parsed_error)
+            parsed_error['components'] = {name: next(iter(values)) for name, values in cluster.samples.items()
+                                          if len(values) == 1}
+            summary.append({
+                'template': cluster.template,
+                'count': cluster.count,
+                'samples': {name: dict(values.most_common()) for name, values in cluster.samples.items()},
+                'explanation': generator.generate_explanation(parsed_error)
+            })
+        return summary
@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import re
+import zlib
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from result_cache import normalize_message
+
+MODEL_MAGIC = b"COGNITO-NB 1\n"
+DEFAULT_MODEL_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'cognito', 'model.nb')
+DEFAULT_BUCKETS = 1 << 16
+DEFAULT_THRESHOLD = 0.6
+MIN_PROBABILITY = 0.7
+# Messages sharing fewer features than this with the training data are left alone
+MIN_KNOWN_FEATURES = 3
+HOLDOUT_EVERY = 10
+_WORD_RE = re.compile(r"[a-z0-9<>_']+")
+
+
+def features(message: str, buckets: int) -> List[int]:
+    """Hashed word and word-pair features of a normalized message"""
+    words = _WORD_RE.findall(normalize_message(message).lower())
+    tokens = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return [zlib.crc32(token.encode('utf-8')) % buckets for token in tokens]
+
+
+def read_corpus(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (label, message) pairs from "label<TAB>message" lines or JSON lines with label and message"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as handle:
+        for number, line in enumerate(handle, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('{'):
+                record = json.loads(line)
+                label, message = record.get('label'), record.get('message')
+            else:
+                label, _, message = line.partition('\t')
+            if not label or not message:
+                raise ValueError(f"{path}:{number}: expected a label and a message")
+            yield label, message
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over hashed token features
+
+    Log-probabilities live in one float32 array laid out bucket-major, so all
+    classes of a feature sit next to each other and the file loads with a
+    single read.
+    """
+
+    def __init__(self, labels: List[str], priors: List[float], weights: array, buckets: int):
+        self.labels = labels
+        self.priors = priors
+        self.weights = weights
+        self.buckets = buckets
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]], buckets: int = DEFAULT_BUCKETS,
+              alpha: float = 1.0) -> 'NaiveBayesModel':
+        """Fit a model on (label, message) pairs with additive smoothing"""
+        label_ids: Dict[str, int] = {}
+        documents: List[int] = []
+        counts: List[array] = []
+        for label, message in examples:
+            label_id = label_ids.get(label)
+            if label_id is None:
+                label_id = label_ids[label] = len(label_ids)
+                documents.append(0)
+                counts.append(array('I', bytes(4 * buckets)))
+            documents[label_id] += 1
+            label_counts = counts[label_id]
+            for bucket in features(message, buckets):
+                label_counts[bucket] += 1
+        if not label_ids:
+            raise ValueError("no training examples")
+
+        classes = len(label_ids)
+        total_documents = sum(documents)
+        priors = [math.log(count / total_documents) for count in documents]
+        weights = array('f', bytes(4 * buckets * classes))
+        denominators = [math.log(sum(label_counts) + alpha * buckets) for label_counts in counts]
+        for bucket in range(buckets):
+            # Features never seen in training stay at zero so they cannot favour small classes
+            if not any(label_counts[bucket] for label_counts in counts):
+                continue
+            offset = bucket * classes
+            for label_id, label_counts in enumerate(counts):
+                weights[offset + label_id] = math.log(label_counts[bucket] + alpha) - denominators[label_id]
+        return cls(list(label_ids), priors, weights, buckets)
+
+    def scores(self, message: str) -> Tuple[List[float], int]:
+        """Per-class log scores and how many of the message's features were seen in training"""
+        classes = len(self.labels)
+        weights = self.weights
+        scores = list(self.priors)
+        known = 0
+        for bucket in features(message, self.buckets):
+            offset = bucket * classes
+            if weights[offset]:
+                known += 1
+                for label_id in range(classes):
+                    scores[label_id] += weights[offset + label_id]
+        return scores, known
+
+    def predict(self, message: str) -> Tuple[str, float]:
+        """Most likely label and its posterior probability, or ('unknown', 0.0) for unfamiliar text"""
+        scores, known = self.scores(message)
+        if known < MIN_KNOWN_FEATURES:
+            return 'unknown', 0.0
+        best = max(range(len(scores)), key=scores.__getitem__)
+        top = scores[best]
+        total = sum(math.exp(score - top) for score in scores)
+        return self.labels[best], 1.0 / total
+
+    def save(self, path: str):
+        header = json.dumps({'labels': self.labels, 'priors': self.priors, 'buckets': self.buckets})
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as handle:
+            handle.write(MODEL_MAGIC)
+            handle.write(header.encode('utf-8') + b'\n')
+            self.weights.tofile(handle)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'NaiveBayesModel':
+        with open(path, 'rb') as handle:
+            if handle.readline() != MODEL_MAGIC:
+                raise ValueError(f"{path}: not a Cognito model")
+            try:
+                header = json.loads(handle.readline())
+            except ValueError:
+                header = None
+            weights = array('f')
+            weights.frombytes(handle.read())
+        if not isinstance(header, dict):
+            header = {}
+        labels, priors, buckets = header.get('labels'), header.get('priors'), header.get('buckets')
+        if (not isinstance(labels, list) or not all(isinstance(label, str) for label in labels)
+                or not isinstance(priors, list) or len(priors) != len(labels)
+                or not all(isinstance(prior, (int, float)) for prior in priors)
+                or not isinstance(buckets, int) or buckets < 1):
+            raise ValueError(f"{path}: malformed model header")
+        if len(weights) != buckets * len(labels):
+            raise ValueError(f"{path}: truncated model")
+        return cls(labels, priors, weights, buckets)
+
+
+def train_file(corpus_path: str, model_path: str = DEFAULT_MODEL_PATH,
+               buckets: int = DEFAULT_BUCKETS) -> Dict[str, object]:
+    """Train on a corpus, holding out every tenth example to measure accuracy, then save"""
+    examples = list(read_corpus(corpus_path))
+    held_out = examples[HOLDOUT_EVERY - 1::HOLDOUT_EVERY]
+    training = [example for index, example in enumerate(examples) if (index + 1) % HOLDOUT_EVERY]
+    model = NaiveBayesModel.train(training or examples, buckets)
+    correct = sum(1 for label, message in held_out if model.predict(message)[0] == label)
+    # The saved model also learns from the held-out examples
+    model = NaiveBayesModel.train(examples, buckets)
+    model.save(model_path)
+    return {'examples': len(examples), 'labels': len(model.labels),
+            'holdout_accuracy': correct / len(held_out) if held_out else None}
+
+
+class ModelParser:
+    """ErrorParser front end that asks a trained model when the patterns are unsure
+
+    Below threshold confidence, the model's label replaces the pattern result
+    if the model is at least MIN_PROBABILITY sure of it.
+    """
+
+    def __init__(self, parser, model: NaiveBayesModel, threshold: float = DEFAULT_THRESHOLD):
+        self.parser = parser
+        self.model = model
+        self.threshold = threshold
+        self.overrides = 0
+
+    def __getattr__(self, name):
+        return getattr(self.parser, name)
+
+    def with_parser(self, parser, generator) -> 'ModelParser':
+        """The same front end around another parser"""
+        return ModelParser(parser, self.model, self.threshold)
+
+    def parse_error(self, error_message: str):
+        parsed_error = self.parser.parse_error(error_message)
+        if parsed_error['confidence'] >= self.threshold:
+            return parsed_error
+        text = self.parser.window(error_message)
+        label, probability = self.model.predict(text)
+        if probability >= MIN_PROBABILITY and label != parsed_error['error_type']:
+            self.overrides += 1
+            parsed_error['error_type'] = label
+            parsed_error['components'] = self.parser.extract_components(text, label)
+            parsed_error['confidence'] = round(min(probability, 0.9), 2)
+            parsed_error['classified_by'] = 'model'
+        return parsed_error
+